@@ -1,11 +1,25 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from contextlib import asynccontextmanager
-from etl.extractor import Extractor
+import asyncio
+import sqlite3
+from uuid import uuid4
+from etl.extractor import SOFASCORE_URL, Extractor
 from etl.load import Load
+from etl.local_replica import ReplicaSyncer, UnsupportedQuery, get_local_replica
+from etl.similarity_index import get_similarity_index
+from etl.mongo_monitor import command_monitor
 import process
+import task_events
+from health import HealthMonitor
+from redis_client import get_redis
+import serialization
+from serialization import ORJSONResponse
+import task_lock
 
 from celery_worker import (
+    BACKFILL_QUEUE,
     celery_app,
     extract_games_by_season_task,
     extract_all_games_task,
@@ -14,23 +28,48 @@ from celery_worker import (
 from celery.result import AsyncResult
 
 from schemas.extraction_schema import AllSeasonsExtractionRequest, SeasonExtractionRequest
+from schemas.versus_schema import VersusBatchRequest
 
 # Instâncias globais (inicializadas no lifespan)
 extractor = None
 load = None
+task_events_hub = None
+health_monitor = None
+replica = None
+replica_syncer = None
+
+# Intervalo (segundos) entre comentários keep-alive no stream de status
+SSE_KEEPALIVE = 15
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Inicializa recursos na startup e limpa no shutdown."""
-    global extractor, load
+    global extractor, load, task_events_hub, health_monitor, replica, replica_syncer
     print("Inicializando Extractor...")
     extractor = Extractor()
     print("Extractor inicializado com sucesso!")
     print("Inicializando Load...")
     load = Load()
     print("Load inicializado com sucesso!")
+    replica = get_local_replica()
+    if replica is not None:
+        print(f"Réplica local em {replica.path}; sincronizando com o MongoDB em background...")
+        replica_syncer = ReplicaSyncer(replica, load.database)
+        await replica_syncer.start()
+    task_events_hub = task_events.TaskEventHub(snapshot=task_status)
+    await task_events_hub.start()
+    health_monitor = HealthMonitor({
+        "celery": lambda: bool(celery_app.control.ping(timeout=1.0)),
+        "redis": lambda: get_redis().ping(),
+        "mongo": lambda: load.client.admin.command("ping").get("ok") == 1,
+    })
+    await health_monitor.start()
     yield
     print("Encerrando aplicação...")
+    await health_monitor.stop()
+    await task_events_hub.stop()
+    if replica_syncer:
+        await replica_syncer.stop()
     if load:
         load.desconnect()
 
@@ -38,7 +77,8 @@ app = FastAPI(
     title="ETL Statistics API",
     description="API para extração de estatísticas de futebol do SofaScore com processamento em background via Celery",
     version="2.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Configuração CORS
@@ -57,9 +97,11 @@ async def root():
         "message": "ETL Statistics API v2.0 - Com processamento em background via Celery",
         "docs": "/docs",
         "endpoints": {
-            "sync": ["/seasons", "/health", "/games"],
-            "async": ["/async/seasons", "/async/games/season", "/async/games"],
-            "status": ["/tasks/{task_id}"]
+            "sync": ["/seasons", "/health", "/health/live", "/health/ready", "/games"],
+            "async": ["/async/seasons", "/async/games/season", "/async/games", "/async/games/resume"],
+            "status": ["/tasks/{task_id}", "/tasks/{task_id}/stream"],
+            "similar": ["/similar/{category}/{game_id}"],
+            "metrics": ["/metrics/mongo"]
         }
     }
 
@@ -69,13 +111,46 @@ async def root():
 # ============================================
 @app.get("/health")
 async def health_check():
-    """Verifica se a API e dependências principais (Extractor e Celery) estão saudáveis."""
+    """Resumo de saúde da API e das dependências, lido do último health check em background."""
+    checks = health_monitor.snapshot()["checks"] if health_monitor else {}
     return {
-        "status": "healthy",
+        "status": "healthy" if health_monitor and health_monitor.is_ready() else "degraded",
         "extractor_ready": extractor is not None,
-        "celery_ready": celery_app.control.inspect().ping() is not None
+        "celery_ready": checks.get("celery", {}).get("ok", False),
+        "redis_ready": checks.get("redis", {}).get("ok", False),
+        "mongo_ready": checks.get("mongo", {}).get("ok", False)
     }
 
+@app.get("/health/live")
+async def liveness_probe():
+    """Liveness: o processo está de pé e respondendo (não consulta dependências)."""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness_probe():
+    """Readiness: Celery, Redis e MongoDB saudáveis no último health check (resultado em memória).
+
+    Retorna 503 se alguma dependência falhou ou se o resultado estiver obsoleto.
+    """
+    if health_monitor is None:
+        return JSONResponse(status_code=503, content={"ready": False, "checks": {}})
+    snapshot = health_monitor.snapshot()
+    return JSONResponse(status_code=200 if snapshot["ready"] else 503, content=snapshot)
+
+@app.get("/metrics/mongo")
+async def mongo_metrics(limit: int = Query(10, ge=1, le=100),
+                        sort: str = Query("total_ms", pattern="^(total_ms|max_ms|avg_ms|count|avg_bytes)$")):
+    """Consultas ao MongoDB agregadas por formato (filtro sem valores) neste processo.
+
+    Parâmetros:
+    - limit: quantidade de formatos retornados.
+    - sort: ordenação dos formatos (total_ms, max_ms, avg_ms, count ou avg_bytes).
+
+    Inclui os últimos comandos acima de MONGO_SLOW_MS, com o plano do explain()
+    quando MONGO_EXPLAIN_SLOW está ativo.
+    """
+    return command_monitor.summary(limit=limit, sort=sort)
+
 def get_tournaments_info():
     categories = ["football", "basketball", "volleyball", "tennis", "american-football"]  # Podemos expandir para outros esportes no futuro
     if extractor is None:
@@ -120,10 +195,51 @@ async def get_seasons(slug_tournament: str, tournament_id: int, country: str):
     if extractor is None:
         raise HTTPException(status_code=503, detail="Extractor não inicializado")
     # Construir a URL da competição com base nos parâmetros
-    competition_url = f"https://www.sofascore.com/pt/football/tournament/{country}/{slug_tournament}/{tournament_id}"
+    competition_url = f"{SOFASCORE_URL}/pt/football/tournament/{country}/{slug_tournament}/{tournament_id}"
     
     return {"seasons": extractor.get_seasons(competition_url)}
 
+def get_reader(category: str):
+    """Fonte das leituras: a réplica local quando sincronizada, senão o MongoDB.
+
+    Retorna (leitor, marcador de fonte/versão).
+    """
+    if replica is not None and replica.is_fresh(category):
+        return replica, replica.marker(category)
+    return load, {"source": "mongo"}
+
+def replica_response(content: dict, marker: dict):
+    """Resposta serializada direto com orjson (sem jsonable_encoder), com a versão no header X-Replica-Version."""
+    version = str(marker["version"]) if marker["source"] == "local" else "mongo"
+    return ORJSONResponse(content, headers={"X-Replica-Version": version})
+
+def read_games(reader, category: str, query: dict, marker: dict):
+    """Lê os jogos na fonte escolhida; consultas que a réplica não suporta vão ao MongoDB."""
+    if reader is load:
+        return load.read_data(category, query=query)
+    try:
+        return reader.read_data(category, query=query)
+    except (UnsupportedQuery, sqlite3.OperationalError) as e:
+        if isinstance(e, sqlite3.OperationalError):
+            print(f"Erro na réplica local, lendo do MongoDB: {str(e)}")
+        marker.clear()
+        marker["source"] = "mongo"
+        return load.read_data(category, query=query)
+
+def resolve_teams(reader, values):
+    """Resolve nomes/apelidos de equipes na fonte escolhida; com erro na réplica usa o MongoDB.
+
+    Os ids das equipes são os mesmos nas duas fontes, então o marcador dos jogos não muda.
+    """
+    values = list(values)
+    if reader is load:
+        return load.resolve_teams(values)
+    try:
+        return reader.resolve_teams(values)
+    except sqlite3.OperationalError as e:
+        print(f"Erro na réplica local ao resolver equipes, usando o MongoDB: {str(e)}")
+        return load.resolve_teams(values)
+
 @app.get("/games/{category}")
 async def get_games(category: str, request: Request):
     """Busca jogos de uma categoria usando filtros dinâmicos via query params.
@@ -133,7 +249,7 @@ async def get_games(category: str, request: Request):
 
     Principais query params aceitos (todos opcionais e combináveis):
     - season: id da temporada.
-    - round: número da rodada.
+    - round: página de eventos da extração; round_number: rodada do campeonato.
     - home_team / away_team: nomes das equipes.
     - Outros campos numéricos ou texto são aceitos e usados como filtro direto.
 
@@ -141,6 +257,9 @@ async def get_games(category: str, request: Request):
     - /games/football?season=87678
     - /games/stats?home_team=Flamengo&away_team=Palmeiras
     - /games/football (retorna todos os jogos da categoria)
+
+    Com LOCAL_REPLICA_PATH configurado, a leitura é feita na réplica local;
+    o campo "replica" (e o header X-Replica-Version) indica a fonte e a versão.
     """
     if load is None:
         raise HTTPException(status_code=503, detail="Load não inicializado")
@@ -158,47 +277,195 @@ async def get_games(category: str, request: Request):
         else:
             filters[key] = value
     
+    reader, marker = get_reader(category)
+
     try:
-        games = load.read_data(category, query=filters)
+        # Equipes são consultadas pelo id do SofaScore; nomes/apelidos são resolvidos uma vez aqui
+        team_filters = {key: filters[key] for key in ('home_team', 'away_team') if key in filters}
+        if team_filters:
+            resolved = resolve_teams(reader, team_filters.values())
+            for key, value in team_filters.items():
+                if value in resolved:
+                    del filters[key]
+                    filters[f'{key}_id'] = resolved[value]
+
+        games = read_games(reader, category, filters, marker)
         
-        # Remove o campo _id do MongoDB para serialização JSON
-        for game in games:
-            if '_id' in game:
-                game['_id'] = str(game['_id'])
-        
-        return {
+        # O _id (ObjectId) é convertido pelo próprio serializer, sem percorrer os jogos
+        return replica_response({
             "count": len(games),
             "filters": filters,
+            "replica": marker,
             "games": games
-        }
+        }, marker)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao buscar jogos: {str(e)}")
 
+def parse_percentiles(value: str):
+    try:
+        percentiles = tuple(float(item) for item in value.split(",") if item.strip())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="percentiles deve ser uma lista de números separados por vírgula")
+    if not percentiles or any(not 0 <= q <= 1 for q in percentiles):
+        raise HTTPException(status_code=400, detail="percentiles deve conter valores entre 0 e 1")
+    return percentiles
+
 @app.get("/versus/{category}")
-async def get_versus_stats(category: str, team_one: str, team_two: str):
+async def get_versus_stats(category: str, team_one: str, team_two: str,
+                           distribution: bool = False, percentiles: str = "0.25,0.5,0.75,0.9"):
     """Compara desempenho histórico entre duas equipes.
 
     Parâmetros de rota:
     - category: coleção/esporte consultado.
     - team_one: equipe A (considerada mandante na primeira busca).
     - team_two: equipe B (considerada visitante na primeira busca).
+    - distribution: inclui variância, desvio padrão, mínimo, máximo e percentis por estatística.
+    - percentiles: percentis calculados quando distribution=true (ex.: "0.5,0.9").
+
+    As equipes podem ser informadas pelo id do SofaScore, nome ou apelido.
     """
     if extractor is None:
         raise HTTPException(status_code=503, detail="Extractor não inicializado")
+    percentiles = parse_percentiles(percentiles)
+    reader, marker = get_reader(category)
     
-    at_house = load.read_data(category, query={"home_team": team_one, "away_team": team_two})
-    at_away = load.read_data(category, query={"home_team": team_two, "away_team": team_one})
+    resolved = resolve_teams(reader, [team_one, team_two])
+    if team_one in resolved and team_two in resolved:
+        home_key, away_key = "home_team_id", "away_team_id"
+        team_one, team_two = resolved[team_one], resolved[team_two]
+    else:
+        # Equipe fora da dimensão de times: mantém a busca antiga pelo nome
+        home_key, away_key = "home_team", "away_team"
+    at_house = read_games(reader, category, {home_key: team_one, away_key: team_two}, marker)
+    at_away = read_games(reader, category, {home_key: team_two, away_key: team_one}, marker)
+
+    return replica_response({
+        **process.get_versus_stats(at_house, at_away, distribution=distribution, percentiles=percentiles),
+        "replica": marker,
+    }, marker)
+
+@app.post("/versus/{category}/batch")
+async def get_versus_stats_batch(category: str, payload: VersusBatchRequest):
+    """Compara vários confrontos diretos com uma única consulta ao banco.
 
-    return process.get_versus_stats(at_house, at_away)
+    Corpo (JSON):
+    - pairs: lista de {"team_one": ..., "team_two": ...} (id, nome ou apelido).
+    - distribution / percentiles: como em GET /versus/{category}.
+
+    Cada item do resultado tem o mesmo formato de GET /versus/{category}.
+    """
+    if load is None:
+        raise HTTPException(status_code=503, detail="Load não inicializado")
+
+    reader, marker = get_reader(category)
+    pairs = [(pair.team_one, pair.team_two) for pair in payload.pairs]
+    resolved = resolve_teams(reader, {team for pair in pairs for team in pair})
+
+    # Monta as chaves de cada confronto (ids quando resolvidos, nomes caso contrário)
+    keyed_pairs = []
+    conditions = []
+    for team_one, team_two in pairs:
+        if team_one in resolved and team_two in resolved:
+            fields = ("home_team_id", "away_team_id")
+            one, two = resolved[team_one], resolved[team_two]
+        else:
+            fields = ("home_team", "away_team")
+            one, two = team_one, team_two
+        keyed_pairs.append((fields, one, two))
+        conditions.append({fields[0]: one, fields[1]: two})
+        conditions.append({fields[0]: two, fields[1]: one})
+
+    games = read_games(reader, category, {"$or": conditions}, marker) if conditions else []
+
+    # Agrupa em memória por (campos, mandante, visitante)
+    grouped = {}
+    for game in games:
+        for fields in (("home_team_id", "away_team_id"), ("home_team", "away_team")):
+            key = (fields, game.get(fields[0]), game.get(fields[1]))
+            grouped.setdefault(key, []).append(game)
+
+    results = []
+    for (team_one, team_two), (fields, one, two) in zip(pairs, keyed_pairs):
+        at_house = grouped.get((fields, one, two), [])
+        at_away = grouped.get((fields, two, one), [])
+        results.append({
+            "team_one": team_one,
+            "team_two": team_two,
+            **process.get_versus_stats(at_house, at_away, distribution=payload.distribution,
+                                       percentiles=payload.percentiles)
+        })
+
+    return replica_response({"count": len(results), "replica": marker, "results": results}, marker)
+
+@app.get("/similar/{category}/{game_id}")
+async def get_similar_games(category: str, game_id: int, k: int = Query(10, ge=1, le=100)):
+    """Jogos passados com estatísticas mais parecidas com as do jogo informado.
+
+    Parâmetros:
+    - category: coleção/esporte consultado.
+    - game_id: id do jogo (evento do SofaScore).
+    - k: quantidade de vizinhos retornados.
+
+    A distância é euclidiana sobre as estatísticas de const_football (mandante
+    e visitante) normalizadas por z-score; menor distância = jogo mais parecido.
+    O índice é atualizado a cada carga e pode ser recriado pela task build_similarity_index.
+    """
+    try:
+        index = get_similarity_index(category)
+        neighbours = await asyncio.to_thread(index.similar, game_id, k)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if neighbours is None:
+        raise HTTPException(status_code=404, detail=f"Jogo {game_id} não está no índice de similaridade de '{category}'")
+
+    # Dados básicos dos vizinhos (sem as estatísticas) em uma única consulta
+    reader, marker = get_reader(category)
+    games = read_games(reader, category, {"$or": [{"id": item["id"]} for item in neighbours]}, marker) if neighbours else []
+    info = {game["id"]: game for game in games}
+    fields = ("season", "tournament_id", "round", "home_team", "away_team", "home_score", "away_score")
+    results = [
+        {**item, **{field: info.get(item["id"], {}).get(field) for field in fields}}
+        for item in neighbours
+    ]
+    return replica_response({"game_id": game_id, "k": k, "count": len(results), "replica": marker, "results": results}, marker)
 
 # ============================================
 # ENDPOINTS ASSÍNCRONOS (processamento em background)
 # ============================================
 
+# Prioridades padrão (0 = mais alta): extração de uma temporada passa à frente de backfills completos
+SEASON_EXTRACTION_PRIORITY = 3
+ALL_SEASONS_EXTRACTION_PRIORITY = 6
+
+def dispatch_single_flight(task, lock_key, args, kwargs=None, priority=None):
+    """Dispara a task apenas se não houver outra idêntica na fila ou em execução.
+
+    Retorna (task_id, deduplicated); quando deduplicated é True, task_id é o
+    id da task que já detém o lock.
+
+    A task expira na fila junto com o lock: se esperar mais que a validade do
+    lock ela é descartada em vez de rodar em paralelo com um novo disparo.
+    """
+    task_id = str(uuid4())
+    queue = celery_app.conf.task_routes.get(task.name, {}).get('queue')
+    ttl = task_lock.BACKFILL_LOCK_TTL if queue == BACKFILL_QUEUE else task_lock.LOCK_TTL
+    holder = task_lock.acquire(lock_key, task_id, celery_app, ttl=ttl)
+    if holder is not None:
+        return holder, True
+    try:
+        task.apply_async(args=args, kwargs=kwargs or {}, task_id=task_id, priority=priority, expires=ttl)
+    except Exception:
+        task_lock.release(lock_key, task_id)
+        raise
+    return task_id, False
+
+
 @app.post("/async/seasons")
-async def get_seasons_async():
+async def get_seasons_async(priority: int = Query(0, ge=0, le=9)):
     """Dispara task Celery para buscar temporadas de todos os torneios configurados."""
-    task = get_seasons_task.delay()
+    task = get_seasons_task.apply_async(priority=priority)
     return {
         "task_id": task.id,
         "status": "processing",
@@ -213,6 +480,7 @@ async def get_games_by_season_async(payload: SeasonExtractionRequest):
     Corpo (JSON):
     - season_id: id da temporada a ser extraída.
     - tournament_id: id do torneio a que a temporada pertence.
+    - priority (opcional): prioridade na fila, de 0 (mais alta) a 9.
     """
     try:
         season_id = payload.season_id
@@ -221,14 +489,26 @@ async def get_games_by_season_async(payload: SeasonExtractionRequest):
         selected_category = get_category_by_tournament_id(tournament_id)
         if selected_category is None:
             selected_category = 'stats'
-        task = extract_games_by_season_task.delay(season_id, tournament_id, selected_category)
+        priority = payload.priority if payload.priority is not None else SEASON_EXTRACTION_PRIORITY
+        task_id, deduplicated = dispatch_single_flight(
+            extract_games_by_season_task,
+            task_lock.season_lock_key(tournament_id, season_id),
+            (season_id, tournament_id, selected_category),
+            priority=priority
+        )
         return {
-            "task_id": task.id,
+            "task_id": task_id,
             "season_id": season_id,
             "tournament_id": tournament_id,
             "category": selected_category,
+            "priority": priority,
             "status": "processing",
-            "message": f"Task iniciada. Dados serão salvos no MongoDB. Use GET /tasks/{{task_id}} para verificar o status"
+            "deduplicated": deduplicated,
+            "message": (
+                "Extração idêntica já está na fila ou em execução. Use GET /tasks/{task_id} para acompanhar"
+                if deduplicated else
+                "Task iniciada. Dados serão salvos no MongoDB. Use GET /tasks/{task_id} para verificar o status"
+            )
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao iniciar extração: {str(e)}")
@@ -243,7 +523,22 @@ async def get_all_games_async(payload: AllSeasonsExtractionRequest):
     - tournament_id: id numérico do torneio.
     - country: país presente na URL do torneio.
     - length_tournaments (opcional): lista com IDs de temporada a serem processados.
+    - priority (opcional): prioridade na fila, de 0 (mais alta) a 9.
     """
+    return schedule_all_games(payload, resume=False)
+
+
+@app.post("/async/games/resume")
+async def resume_all_games_async(payload: AllSeasonsExtractionRequest):
+    """Retoma uma extração de todas as temporadas a partir do último checkpoint.
+
+    Mesmo corpo de POST /async/games. Temporadas já concluídas são puladas e a
+    temporada interrompida continua da página seguinte à última gravada.
+    """
+    return schedule_all_games(payload, resume=True)
+
+
+def schedule_all_games(payload: AllSeasonsExtractionRequest, resume: bool):
     slug_tournament = payload.slug_tournament
     tournament_id = payload.tournament_id
     country = payload.country
@@ -252,15 +547,25 @@ async def get_all_games_async(payload: AllSeasonsExtractionRequest):
     selected_category = get_category_by_tournament_id(tournament_id)
     if selected_category is None:
         selected_category = 'stats'
-    task = extract_all_games_task.delay(slug_tournament, 
-                                        tournament_id, 
-                                        country,
-                                        collection=selected_category,
-                                        length_tournaments=length_tournaments)
+    priority = payload.priority if payload.priority is not None else ALL_SEASONS_EXTRACTION_PRIORITY
+    task_id, deduplicated = dispatch_single_flight(
+        extract_all_games_task,
+        task_lock.seasons_lock_key(tournament_id, length_tournaments),
+        (slug_tournament, tournament_id, country),
+        {"collection": selected_category, "length_tournaments": length_tournaments, "resume": resume},
+        priority=priority
+    )
     return {
-        "task_id": task.id,
+        "task_id": task_id,
+        "priority": priority,
+        "resume": resume,
         "status": "processing",
-        "message": f"Task iniciada. Esta operação pode demorar. Dados serão salvos no MongoDB. Use GET /tasks/{{task_id}} para verificar o status"
+        "deduplicated": deduplicated,
+        "message": (
+            "Extração idêntica já está na fila ou em execução. Use GET /tasks/{task_id} para acompanhar"
+            if deduplicated else
+            "Task iniciada. Esta operação pode demorar. Dados serão salvos no MongoDB. Use GET /tasks/{task_id} para verificar o status"
+        )
     }
 
 
@@ -268,9 +573,8 @@ async def get_all_games_async(payload: AllSeasonsExtractionRequest):
 # ENDPOINTS DE STATUS DE TASKS
 # ============================================
 
-@app.get("/tasks/{task_id}")
-async def get_task_status(task_id: str):
-    """Consulta o estado atual de uma task Celery pelo id."""
+def task_status(task_id: str) -> dict:
+    """Monta a resposta de status de uma task a partir do backend do Celery."""
     task_result = AsyncResult(task_id, app=celery_app)
     
     if task_result.state == 'PENDING':
@@ -307,6 +611,55 @@ async def get_task_status(task_id: str):
     return response
 
 
+@app.get("/tasks/{task_id}")
+async def get_task_status(task_id: str):
+    """Consulta o estado atual de uma task Celery pelo id."""
+    # Retornada direto: o resultado pode trazer todos os jogos extraídos e não passa pelo jsonable_encoder
+    return ORJSONResponse(task_status(task_id))
+
+
+@app.get("/tasks/{task_id}/stream")
+async def stream_task_status(task_id: str, request: Request):
+    """Acompanha uma task via Server-Sent Events, sem polling.
+
+    Envia o estado atual e, em seguida, cada atualização de progresso até a
+    task terminar (SUCCESS, FAILURE ou REVOKED). Vários clientes acompanhando
+    a mesma task compartilham uma única assinatura no Redis.
+    """
+    if task_events_hub is None:
+        raise HTTPException(status_code=503, detail="Stream de tasks não inicializado")
+
+    def format_event(event):
+        return f"event: {event.get('state', 'message')}\ndata: ".encode() + serialization.dumps(event) + b"\n\n"
+
+    async def events():
+        # Assina antes de ler o estado atual para não perder eventos entre as duas etapas
+        queue = await task_events_hub.subscribe(task_id)
+        try:
+            event = await task_events_hub.snapshot(task_id)
+            yield format_event(event)
+            while event.get('state') not in task_events.FINAL_STATES:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # Sem eventos: o hub confere no backend (uma vez por task) se ela terminou sem
+                    # publicar o evento final; nesse caso o evento chega pela fila
+                    await task_events_hub.recheck(task_id, SSE_KEEPALIVE)
+                    yield b": keep-alive\n\n"
+                    continue
+                yield format_event(event)
+        finally:
+            await task_events_hub.unsubscribe(task_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.delete("/tasks/{task_id}")
 async def cancel_task(task_id: str):
     """Cancela uma task em background, solicitando encerramento imediato."""
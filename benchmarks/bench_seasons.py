@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark da descoberta de temporadas.
+
+Compara, sobre uma página sintética do tamanho de uma página de torneio do
+SofaScore, o parse completo com BeautifulSoup (caminho antigo) com a leitura
+em streaming de find_next_data e com o cache por torneio.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_seasons
+    python -m benchmarks.bench_seasons --live   # também mede contra o SofaScore
+"""
+
+import argparse
+import json
+import time
+
+from bs4 import BeautifulSoup
+
+from etl import extractor as extractor_module
+from etl.extractor import Extractor, find_next_data
+
+
+def build_page(seasons=30, filler_kb=900):
+    """Monta um HTML com __NEXT_DATA__ no meio de muito markup, como a página real."""
+    next_data = {
+        "props": {
+            "pageProps": {
+                "initialProps": {
+                    "seasons": [{"name": f"Brasileirão {2026 - i}", "year": str(2026 - i), "id": 90000 - i} for i in range(seasons)]
+                }
+            }
+        }
+    }
+    block = '<div class="sc-row"><span class="name">Team</span><a href="/team/1">link</a></div>\n'
+    head = block * (filler_kb * 1024 // len(block) // 3)
+    tail = block * (filler_kb * 1024 // len(block) * 2 // 3)
+    return (
+        "<!DOCTYPE html><html><head><title>Torneio</title></head><body>"
+        + head
+        + f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(next_data)}</script>'
+        + tail
+        + "</body></html>"
+    )
+
+
+def chunked(text, size=16384):
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+def with_beautifulsoup(page):
+    soup = BeautifulSoup(page, "html.parser")
+    element = soup.find("script", {"id": "__NEXT_DATA__"})
+    return json.loads(element.text)["props"]["pageProps"]["initialProps"]["seasons"]
+
+
+def with_stream_scan(page):
+    content = find_next_data(chunked(page))
+    return json.loads(content)["props"]["pageProps"]["initialProps"]["seasons"]
+
+
+def measure(label, func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    median = timings[len(timings) // 2]
+    print(f"  {label:<28} mediana {median * 1000:9.3f} ms   min {timings[0] * 1000:9.3f} ms")
+    return median
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--live", action="store_true", help="mede também contra o SofaScore real")
+    parser.add_argument("--url", default="https://www.sofascore.com/pt/football/tournament/brazil/brasileirao-serie-a/325")
+    args = parser.parse_args()
+
+    page = build_page()
+    assert with_beautifulsoup(page) == with_stream_scan(page)
+    print(f"Página sintética: {len(page) / 1024:.0f} KB")
+    bs4_time = measure("BeautifulSoup (html.parser)", lambda: with_beautifulsoup(page), args.repeat)
+    scan_time = measure("find_next_data (streaming)", lambda: with_stream_scan(page), args.repeat)
+    print(f"  ganho: {bs4_time / scan_time:.1f}x")
+
+    if args.live:
+        print(f"\nSofaScore real: {args.url}")
+        extractor = Extractor()
+        extractor._warm_up()
+        session = extractor.session
+        measure("página + BeautifulSoup", lambda: with_beautifulsoup(session.get(args.url).text), 3)
+        measure("get_seasons (sem cache)", lambda: (extractor_module._seasons_cache.clear(), extractor.get_seasons(args.url)), 3)
+        measure("get_seasons (cache)", lambda: extractor.get_seasons(args.url), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Benchmark da serialização de respostas grandes e resultados de tasks.
+
+Compara, sobre milhares de jogos sintéticos com a árvore de estatísticas no
+formato salvo pelo Transform (e _id ObjectId, como lidos do MongoDB):
+
+- /games: caminho antigo (laço convertendo _id + jsonable_encoder + JSONResponse)
+  com o ORJSONResponse retornado direto pelo endpoint;
+- Celery: clean_mongodb_ids + json (antigo) com o serializer orjson registrado;
+- /tasks/{id} e /tasks/{id}/stream com o resultado de uma extração concluída:
+  jsonable_encoder + JSONResponse / json.dumps (antigo) com ORJSONResponse /
+  serialization.dumps.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_serialization --games 2000,10000 --repeat 10
+"""
+
+import argparse
+import copy
+import json
+import time
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from kombu.serialization import dumps as kombu_dumps, loads as kombu_loads
+
+from serialization import CELERY_SERIALIZER, ORJSONResponse, dumps, register_celery_serializer
+
+STAT_GROUPS = {
+    "Match overview": ["Ball possession", "Expected goals", "Big chances", "Total shots", "Goalkeeper saves",
+                       "Corner kicks", "Fouls", "Passes", "Tackles", "Free kicks", "Yellow cards"],
+    "Shots": ["Total shots", "Shots on target", "Hit woodwork", "Shots off target", "Blocked shots",
+              "Shots inside box", "Shots outside box"],
+    "Passes": ["Accurate passes", "Throw-ins", "Final third entries", "Long balls", "Crosses"],
+    "Duels": ["Dispossessed", "Ground duels", "Aerial duels", "Dribbles"],
+    "Defending": ["Tackles won", "Total tackles", "Interceptions", "Recoveries", "Clearances"],
+    "Goalkeeping": ["Total saves", "Goals prevented", "High claims", "Punches", "Goal kicks"],
+}
+
+
+def build_games(count):
+    games = []
+    for index in range(count):
+        stats = []
+        for period in ("ALL", "1ST", "2ND"):
+            for group, names in STAT_GROUPS.items():
+                stats.append({group: [
+                    {
+                        "name": name,
+                        "home": str(index % 17),
+                        "away": str(index % 11),
+                        "homeValue": index % 17,
+                        "awayValue": index % 11,
+                        "compareCode": 1,
+                        "statisticsType": "positive",
+                        "period": period,
+                    }
+                    for name in names
+                ]})
+        games.append({
+            "_id": ObjectId(),
+            "season": 58766,
+            "tournament_id": 325,
+            "round": index % 38 + 1,
+            "id": 12000000 + index,
+            "home_team": "Flamengo",
+            "away_team": "Palmeiras",
+            "home_team_id": 5981,
+            "away_team_id": 1963,
+            "home_score": index % 4,
+            "away_score": index % 3,
+            "updated_at": 1790000000.0 + index,
+            "stats": stats,
+        })
+    return games
+
+
+def old_games_response(games):
+    for game in games:
+        if "_id" in game:
+            game["_id"] = str(game["_id"])
+    content = jsonable_encoder({"count": len(games), "filters": {}, "games": games})
+    return JSONResponse(content).body
+
+
+def new_games_response(games):
+    return ORJSONResponse({"count": len(games), "filters": {}, "games": games}).body
+
+
+def old_task_result(games):
+    for game in games:
+        game.pop("_id", None)
+    return kombu_dumps({"status": "completed", "games": games}, serializer="json")[2]
+
+
+def new_task_result(games):
+    return kombu_dumps({"status": "completed", "games": games}, serializer=CELERY_SERIALIZER)[2]
+
+
+def task_status_payload(games):
+    # Formato de task_status() para uma extração concluída (ObjectId já convertido pelo resultado do Celery)
+    for game in games:
+        game["_id"] = str(game["_id"])
+    return {"task_id": "bench", "state": "SUCCESS",
+            "result": {"status": "completed", "season_id": 58766, "total_games": len(games), "games": games}}
+
+
+def old_task_status(payload):
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+def new_task_status(payload):
+    return ORJSONResponse(payload).body
+
+
+def old_task_stream_event(payload):
+    return f"event: SUCCESS\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+def new_task_stream_event(payload):
+    return b"event: SUCCESS\ndata: " + dumps(payload) + b"\n\n"
+
+
+def measure(label, func, games, repeat):
+    timings = []
+    for _ in range(repeat):
+        # Os caminhos antigos alteram os documentos; cada rodada usa uma cópia (fora da medição)
+        data = copy.deepcopy(games)
+        start = time.perf_counter()
+        func(data)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    median = timings[len(timings) // 2]
+    print(f"  {label:<34} mediana {median * 1000:9.2f} ms   min {timings[0] * 1000:9.2f} ms")
+    return median
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", default="1000,5000", help="quantidades de jogos separadas por vírgula")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    register_celery_serializer()
+    for count in (int(value) for value in args.games.split(",")):
+        games = build_games(count)
+        old_body = old_games_response(copy.deepcopy(games))
+        new_body = new_games_response(copy.deepcopy(games))
+        assert json.loads(old_body) == json.loads(new_body)
+        new_result = new_task_result(copy.deepcopy(games))
+        assert len(kombu_loads(new_result, "application/x-orjson", "utf-8")["games"]) == count
+        print(f"{count} jogos ({len(new_body) / 1024 / 1024:.1f} MB de JSON)")
+
+        old_time = measure("/games: _id + jsonable_encoder", old_games_response, games, args.repeat)
+        new_time = measure("/games: ORJSONResponse", new_games_response, games, args.repeat)
+        print(f"  ganho: {old_time / new_time:.1f}x")
+        old_time = measure("Celery: clean_mongodb_ids + json", old_task_result, games, args.repeat)
+        new_time = measure("Celery: orjson", new_task_result, games, args.repeat)
+        print(f"  ganho: {old_time / new_time:.1f}x")
+
+        payload = task_status_payload(copy.deepcopy(games))
+        assert json.loads(old_task_status(payload)) == json.loads(new_task_status(payload))
+        old_time = measure("/tasks: jsonable_encoder", old_task_status, payload, args.repeat)
+        new_time = measure("/tasks: ORJSONResponse", new_task_status, payload, args.repeat)
+        print(f"  ganho: {old_time / new_time:.1f}x")
+        old_time = measure("/tasks/stream: json.dumps", old_task_stream_event, payload, args.repeat)
+        new_time = measure("/tasks/stream: orjson", new_task_stream_event, payload, args.repeat)
+        print(f"  ganho: {old_time / new_time:.1f}x\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Teste de carga da API contra dependências locais.
+
+Sobe a aplicação FastAPI (uvicorn, em uma thread) com:
+- MongoDB: mongomock populado com jogos sintéticos (ou um mongod local via --mongo-uri);
+- Redis: fakeredis; backend do Celery em memória, com resultados de tasks semeados;
+- SofaScore: servidor HTTP local que imita os endpoints usados pela API.
+
+Em seguida dispara uma mistura configurável de requisições com a concorrência
+alvo e reporta, por rota, p50/p95/p99, throughput e taxa de erro. O resultado é
+salvo em JSON e pode ser comparado com uma execução anterior (--compare).
+
+Uso (a partir da raiz do repositório):
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.load_test --concurrency 32 --duration 20
+    python -m benchmarks.load_test --mix games=5,versus=3,tasks=2 --compare benchmarks/results/<anterior>.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+
+from const.const_football import DEFENDING, DUELS, MATCH_OVER_VIEW, PASSES, SHOTS
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+CATEGORY = 'football'
+DEFAULT_MIX = 'games=40,versus=30,tournaments=10,tasks=20'
+
+
+# ============================================
+# UPSTREAM FALSO DO SOFASCORE
+# ============================================
+
+class FakeSofaScoreHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.path.startswith('/api/v1/config/default-unique-tournaments/'):
+            category = self.path.rstrip('/').rsplit('/', 1)[-1]
+            body = {
+                'uniqueTournaments': [
+                    {'name': f'Torneio {i}', 'slug': f'torneio-{i}', 'id': 300 + i, 'category': {'slug': 'brazil'}}
+                    for i in range(10)
+                ] if category == CATEGORY else []
+            }
+            self.__send(200, json.dumps(body).encode(), 'application/json')
+        elif self.path.startswith('/pt/'):
+            self.__send(200, b'<html><body>SofaScore</body></html>', 'text/html')
+        else:
+            self.__send(404, b'{}', 'application/json')
+
+    def __send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake_upstream(latency_ms):
+    FakeSofaScoreHandler.latency = latency_ms / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeSofaScoreHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ============================================
+# DADOS SINTÉTICOS
+# ============================================
+
+def build_stats(rng):
+    groups = []
+    for group_name, names in (('Match overview', MATCH_OVER_VIEW), ('Shots', SHOTS), ('Passes', PASSES),
+                              ('Duels', DUELS), ('Defending', DEFENDING)):
+        items = []
+        for name in names:
+            home, away = rng.randint(0, 30), rng.randint(0, 30)
+            items.append({'name': name, 'home': str(home), 'away': str(away), 'homeValue': home, 'awayValue': away})
+        groups.append({'groupName': group_name, 'statisticsItems': items})
+    return groups
+
+
+def build_games(total_games, teams, seasons, rng):
+    games = []
+    for game_id in range(1, total_games + 1):
+        home, away = rng.sample(range(teams), 2)
+        games.append({
+            'season': 50000 + game_id % seasons,
+            'tournament_id': 325,
+            'round': game_id % 38 + 1,
+            'id': game_id,
+            'home_team': f'Time {home}',
+            'away_team': f'Time {away}',
+            'home_team_id': 1000 + home,
+            'away_team_id': 1000 + away,
+            'home_score': rng.randint(0, 4),
+            'away_score': rng.randint(0, 4),
+            'stats': build_stats(rng),
+        })
+    return games
+
+
+def seed(args, rng):
+    """Popula MongoDB, dimensão de times e resultados de tasks; retorna o contexto das requisições."""
+    import api
+    from celery_worker import celery_app
+    from etl.load import TEAMS_COLLECTION, Load, normalize_team_name
+
+    if args.mongo_uri:
+        from pymongo import MongoClient
+        client = MongoClient(args.mongo_uri)
+        client.drop_database('Statistics')
+    else:
+        import mongomock
+        client = mongomock.MongoClient()
+
+    load = Load(client=client)
+    games = build_games(args.games, args.teams, args.seasons, rng)
+    load.database.get_collection(CATEGORY).insert_many(games)
+    load.database.get_collection(TEAMS_COLLECTION).insert_many([
+        {'_id': 1000 + team, 'name': f'Time {team}', 'aliases': [f'Time {team}'], 'alias_keys': [normalize_team_name(f'Time {team}')]}
+        for team in range(args.teams)
+    ])
+    if args.mongo_uri:
+        load.ensure_indexes(CATEGORY)
+
+    task_ids = []
+    for index in range(args.tasks):
+        task_id = f'bench-task-{index}'
+        if index % 2:
+            celery_app.backend.store_result(task_id, {'current': 10, 'total': 38, 'status': 'Extraindo'}, 'PROGRESS')
+        else:
+            result_games = [{key: value for key, value in game.items() if key != '_id'} for game in games[:args.task_games]]
+            celery_app.backend.store_result(
+                task_id,
+                {'status': 'completed', 'season_id': 50000, 'total_games': len(result_games), 'games': result_games},
+                'SUCCESS'
+            )
+        task_ids.append(task_id)
+
+    api.load = load
+    api.extractor = api.Extractor()
+    return {
+        'seasons': sorted({game['season'] for game in games}),
+        'teams': [f'Time {team}' for team in range(args.teams)],
+        'task_ids': task_ids,
+    }
+
+
+# ============================================
+# SERVIDOR DA API
+# ============================================
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_api(port):
+    import uvicorn
+    import api
+
+    # lifespan desligado: as dependências já foram injetadas por seed()
+    config = uvicorn.Config(api.app, host='127.0.0.1', port=port, lifespan='off', log_level='warning')
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+# ============================================
+# GERAÇÃO DE CARGA
+# ============================================
+
+def parse_mix(raw):
+    mix = {}
+    for item in raw.split(','):
+        route, _, weight = item.partition('=')
+        mix[route.strip()] = float(weight or 1)
+    unknown = set(mix) - set(ROUTES)
+    if unknown:
+        raise SystemExit(f"Rotas desconhecidas em --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+ROUTES = {
+    'games': lambda ctx, rng: f"/games/{CATEGORY}?season={rng.choice(ctx['seasons'])}",
+    'versus': lambda ctx, rng: "/versus/{}?team_one={}&team_two={}".format(CATEGORY, *map(quote, rng.sample(ctx['teams'], 2))),
+    'tournaments': lambda ctx, rng: "/tournaments",
+    'tasks': lambda ctx, rng: f"/tasks/{rng.choice(ctx['task_ids'])}",
+}
+
+
+async def run_load(base_url, ctx, mix, concurrency, duration, total_requests, seed_value):
+    import httpx
+
+    routes = list(mix)
+    weights = [mix[route] for route in routes]
+    samples = {route: [] for route in routes}
+    errors = {route: 0 for route in routes}
+    issued = 0
+    deadline = time.perf_counter() + duration
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker(worker_id):
+            nonlocal issued
+            rng = random.Random(seed_value + worker_id)
+            while True:
+                if total_requests is not None:
+                    if issued >= total_requests:
+                        return
+                elif time.perf_counter() >= deadline:
+                    return
+                issued += 1
+                route = rng.choices(routes, weights)[0]
+                start = time.perf_counter()
+                try:
+                    response = await client.get(ROUTES[route](ctx, rng))
+                    failed = response.status_code >= 400
+                except httpx.HTTPError:
+                    failed = True
+                samples[route].append(time.perf_counter() - start)
+                if failed:
+                    errors[route] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return samples, errors, elapsed
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, errors, elapsed):
+    routes = {}
+    for route, values in samples.items():
+        values = sorted(values)
+        count = len(values)
+        routes[route] = {
+            'requests': count,
+            'errors': errors[route],
+            'error_rate': errors[route] / count if count else 0.0,
+            'throughput_rps': count / elapsed if elapsed else 0.0,
+            'mean_ms': sum(values) / count * 1000 if count else None,
+            'p50_ms': percentile(values, 0.50) * 1000 if count else None,
+            'p95_ms': percentile(values, 0.95) * 1000 if count else None,
+            'p99_ms': percentile(values, 0.99) * 1000 if count else None,
+            'max_ms': values[-1] * 1000 if count else None,
+        }
+    total = sum(route['requests'] for route in routes.values())
+    total_errors = sum(route['errors'] for route in routes.values())
+    return {
+        'elapsed_s': elapsed,
+        'total_requests': total,
+        'throughput_rps': total / elapsed if elapsed else 0.0,
+        'error_rate': total_errors / total if total else 0.0,
+        'routes': routes,
+    }
+
+
+def print_report(summary):
+    header = f"{'rota':<12} {'reqs':>7} {'rps':>8} {'erro %':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    print(header)
+    print('-' * len(header))
+    for route, data in summary['routes'].items():
+        if not data['requests']:
+            continue
+        print(
+            f"{route:<12} {data['requests']:>7} {data['throughput_rps']:>8.1f} {data['error_rate'] * 100:>7.2f} "
+            f"{data['p50_ms']:>9.2f} {data['p95_ms']:>9.2f} {data['p99_ms']:>9.2f} {data['max_ms']:>9.2f}"
+        )
+    print('-' * len(header))
+    print(f"total: {summary['total_requests']} requisições em {summary['elapsed_s']:.1f}s "
+          f"({summary['throughput_rps']:.1f} req/s, erro {summary['error_rate'] * 100:.2f}%)")
+
+
+def compare(summary, baseline_path, tolerance):
+    """Compara p95 e taxa de erro com uma execução anterior; retorna as regressões encontradas."""
+    with open(baseline_path) as file:
+        baseline = json.load(file)['summary']
+    regressions = []
+    print(f"\nComparação com {baseline_path} (tolerância {tolerance * 100:.0f}%):")
+    for route, data in summary['routes'].items():
+        previous = baseline['routes'].get(route)
+        if not previous or not previous['requests'] or not data['requests']:
+            continue
+        ratio = data['p95_ms'] / previous['p95_ms'] if previous['p95_ms'] else 1.0
+        regressed = ratio > 1 + tolerance or data['error_rate'] > previous['error_rate'] + 0.01
+        print(f"  {route:<12} p95 {previous['p95_ms']:.2f} -> {data['p95_ms']:.2f} ms ({ratio:.2f}x)"
+              f"{'  REGRESSÃO' if regressed else ''}")
+        if regressed:
+            regressions.append(route)
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'pesos por rota (padrão: {DEFAULT_MIX})')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=15, help='segundos de carga')
+    parser.add_argument('--requests', type=int, default=None, help='total de requisições (substitui --duration)')
+    parser.add_argument('--games', type=int, default=5000, help='jogos semeados no MongoDB')
+    parser.add_argument('--teams', type=int, default=20)
+    parser.add_argument('--seasons', type=int, default=10)
+    parser.add_argument('--tasks', type=int, default=20, help='resultados de tasks semeados no backend')
+    parser.add_argument('--task-games', type=int, default=380, help='jogos no resultado de cada task concluída')
+    parser.add_argument('--upstream-latency-ms', type=float, default=0, help='latência do SofaScore falso')
+    parser.add_argument('--mongo-uri', default=None, help='usa um mongod local em vez do mongomock')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=None, help='arquivo JSON de saída')
+    parser.add_argument('--compare', default=None, help='JSON de uma execução anterior')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='regressão tolerada no p95 (fração)')
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    upstream = start_fake_upstream(args.upstream_latency_ms)
+    # Precisa ser definido antes de importar a API (URLs, Redis e backend do Celery)
+    os.environ['SOFASCORE_URL'] = f"http://127.0.0.1:{upstream.server_port}"
+    import fakeredis
+    import redis_client
+    redis_client._client = fakeredis.FakeRedis(decode_responses=True)
+    from celery_worker import celery_app
+    celery_app.conf.result_backend = 'cache+memory://'
+
+    rng = random.Random(args.seed)
+    print(f"Semeando {args.games} jogos, {args.teams} times e {args.tasks} tasks...")
+    ctx = seed(args, rng)
+    port = free_port()
+    server = start_api(port)
+
+    print(f"Carga: mix={args.mix} concorrência={args.concurrency} "
+          + (f"requisições={args.requests}" if args.requests else f"duração={args.duration}s"))
+    samples, errors, elapsed = asyncio.run(
+        run_load(f"http://127.0.0.1:{port}", ctx, mix, args.concurrency, args.duration, args.requests, args.seed)
+    )
+    server.should_exit = True
+    upstream.shutdown()
+
+    summary = summarize(samples, errors, elapsed)
+    print()
+    print_report(summary)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(RESULTS_DIR, f"load_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, 'w') as file:
+        json.dump({
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+            'summary': summary,
+        }, file, indent=2)
+    print(f"\nResultado salvo em {output}")
+
+    if args.compare and compare(summary, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,23 @@
 from celery import Celery
-from etl.extractor import Extractor
+from kombu import Queue
+from celery.signals import task_postrun, task_prerun, task_revoked, worker_process_init, worker_process_shutdown
+from etl.extractor import SOFASCORE_URL, Extractor
 from etl.transform import Transform
-from etl.load import Load
+from etl.load import Load, create_mongo_client
+from etl.local_replica import get_local_replica
+from etl.similarity_index import get_similarity_index
 from dotenv import load_dotenv
 import os
 from typing import List, Optional, Union
+import task_events
+import task_lock
+from checkpoint import ExtractionCheckpoint
+from live_refresh import LiveRefresh
+from serialization import CELERY_SERIALIZER, register_celery_serializer
 
 load_dotenv()
 
-def clean_mongodb_ids(data):
-    if isinstance(data, list):
-        for item in data:
-            if '_id' in item:
-                del item['_id']
-        return data
-    elif isinstance(data, dict):
-        if '_id' in data:
-            del data['_id']
-        return data
-    return data
+register_celery_serializer()
 
 # Configuração do Celery com Redis como broker
 REDIS_URL = os.getenv('REDIS_URL', os.getenv('REDIS_URL'))
@@ -31,9 +30,11 @@ celery_app = Celery(
 
 # Configurações do Celery
 celery_app.conf.update(
-    task_serializer='json',
-    accept_content=['json'],
-    result_serializer='json',
+    # orjson converte ObjectId na serialização; 'json' continua aceito para mensagens já enfileiradas
+    task_serializer=CELERY_SERIALIZER,
+    accept_content=[CELERY_SERIALIZER, 'json'],
+    result_serializer=CELERY_SERIALIZER,
+    result_accept_content=[CELERY_SERIALIZER, 'json'],
     timezone='America/Sao_Paulo',
     enable_utc=True,
     task_track_started=True,
@@ -41,38 +42,144 @@ celery_app.conf.update(
     task_soft_time_limit=3300,  # 55 minutos
 )
 
-@celery_app.task(bind=True, name='extract_games_by_season')
+# Filas separadas: tarefas rápidas (interactive) não esperam atrás de backfills longos
+INTERACTIVE_QUEUE = 'interactive'
+BACKFILL_QUEUE = 'backfill'
+
+# Limites de tempo por fila (segundos)
+INTERACTIVE_TIME_LIMIT = int(os.getenv('INTERACTIVE_TIME_LIMIT', 300))
+INTERACTIVE_SOFT_TIME_LIMIT = INTERACTIVE_TIME_LIMIT - 30
+BACKFILL_TIME_LIMIT = int(os.getenv('BACKFILL_TIME_LIMIT', 3600))
+BACKFILL_SOFT_TIME_LIMIT = BACKFILL_TIME_LIMIT - 300
+
+celery_app.conf.update(
+    task_queues=(Queue(INTERACTIVE_QUEUE), Queue(BACKFILL_QUEUE)),
+    task_default_queue=INTERACTIVE_QUEUE,
+    task_routes={
+        'get_seasons': {'queue': INTERACTIVE_QUEUE},
+        'discover_live_events': {'queue': INTERACTIVE_QUEUE},
+        'poll_live_events': {'queue': INTERACTIVE_QUEUE},
+        'extract_games_by_season': {'queue': BACKFILL_QUEUE},
+        'extract_all_games': {'queue': BACKFILL_QUEUE},
+        'backfill_team_ids': {'queue': BACKFILL_QUEUE},
+        'build_similarity_index': {'queue': BACKFILL_QUEUE},
+    },
+    # Prioridade no Redis: 0 é a mais alta, 9 a mais baixa
+    broker_transport_options={
+        'priority_steps': list(range(10)),
+        'sep': ':',
+        'queue_order_strategy': 'priority',
+    },
+    task_default_priority=5,
+)
+
+# Agenda do Celery beat para atualização das partidas ao vivo
+celery_app.conf.beat_schedule = {
+    'discover-live-events': {
+        'task': 'discover_live_events',
+        'schedule': float(os.getenv('LIVE_DISCOVERY_INTERVAL', 1800)),
+    },
+    'poll-live-events': {
+        'task': 'poll_live_events',
+        'schedule': float(os.getenv('LIVE_POLL_TICK', 60)),
+    },
+}
+
+# Clientes HTTP e MongoDB compartilhados pelas tasks do processo worker
+_extractor = None
+_loader = None
+
+
+@worker_process_init.connect
+def init_worker_clients(**kwargs):
+    """Cria os clientes uma vez por processo (após o fork do prefork)."""
+    global _extractor, _loader
+    _extractor = Extractor()
+    _loader = Load(client=create_mongo_client(), replica=get_local_replica(), similarity_index=True)
+
+
+@worker_process_shutdown.connect
+def close_worker_clients(**kwargs):
+    global _extractor, _loader
+    if _loader is not None:
+        _loader.client.close()
+    if _extractor is not None:
+        _extractor.session.close()
+    _extractor = None
+    _loader = None
+
+
+def get_extractor() -> Extractor:
+    """Extractor do processo; criado sob demanda fora do prefork (pool solo, eager)."""
+    global _extractor
+    if _extractor is None:
+        _extractor = Extractor()
+    return _extractor
+
+
+def get_loader() -> Load:
+    """Load do processo, com MongoClient compartilhado entre as tasks."""
+    global _loader
+    if _loader is None:
+        _loader = Load(client=create_mongo_client(), replica=get_local_replica(), similarity_index=True)
+    return _loader
+
+
+def report_progress(task, lock_key: str, meta: dict):
+    """Atualiza o progresso da task, avisa quem acompanha e renova o lock de execução única."""
+    task.update_state(state='PROGRESS', meta=meta)
+    task_events.publish(task.request.id, {'task_id': task.request.id, 'state': 'PROGRESS', 'progress': meta})
+    task_lock.refresh(lock_key, task.request.id)
+
+
+@task_prerun.connect
+def publish_task_started(task_id=None, **kwargs):
+    task_events.publish(task_id, {'task_id': task_id, 'state': 'STARTED', 'info': None})
+
+
+@task_postrun.connect
+def publish_task_finished(task_id=None, state=None, **kwargs):
+    # O resultado completo é lido do backend pela API, uma vez por task
+    task_events.publish(task_id, {'task_id': task_id, 'state': state})
+
+
+@task_revoked.connect
+def publish_task_revoked(request=None, **kwargs):
+    if request is not None:
+        task_events.publish(request.id, {'task_id': request.id, 'state': 'REVOKED'})
+
+@celery_app.task(bind=True, name='extract_games_by_season', time_limit=BACKFILL_TIME_LIMIT, soft_time_limit=BACKFILL_SOFT_TIME_LIMIT)
 def extract_games_by_season_task(self, season_id: int, tournament_id: int, collection: str = "games"):
+    lock_key = task_lock.season_lock_key(tournament_id, season_id)
     try:
         # Atualiza progresso
-        self.update_state(state='PROGRESS', meta={'current': 0, 'total': 38, 'status': 'Iniciando extração...'})
+        report_progress(self, lock_key, {'current': 0, 'total': 38, 'status': 'Iniciando extração...'})
         
-        # Inicializa extractor
-        extractor = Extractor()
-        self.update_state(state='PROGRESS', meta={'current': 1, 'total': 38, 'status': 'Extractor inicializado'})
+        extractor = get_extractor()
+        report_progress(self, lock_key, {'current': 1, 'total': 38, 'status': 'Extractor inicializado'})
         
-        # Extrai jogos
-        games = extractor.get_games_by_season(tournament_id, season_id)
-        self.update_state(state='PROGRESS', meta={'current': 35, 'total': 38, 'status': f'{len(games)} jogos extraídos'})
+        # Extrai jogos, renovando o lock durante o download da temporada
+        games = extractor.get_games_by_season(
+            tournament_id,
+            season_id,
+            heartbeat=lambda: task_lock.refresh(lock_key, self.request.id)
+        )
+        report_progress(self, lock_key, {'current': 35, 'total': 38, 'status': f'{len(games)} jogos extraídos'})
         
         # Aplica transformações se necessário
         if games:
             transformer = Transform(games, tournament_id)
             games = transformer.transform()
-            self.update_state(state='PROGRESS', meta={'current': 36, 'total': 38, 'status': 'Dados transformados'})
+            report_progress(self, lock_key, {'current': 36, 'total': 38, 'status': 'Dados transformados'})
             
             # Salva no MongoDB
-            loader = Load()
+            loader = get_loader()
             games_saved = loader.read_data(collection, {'season': season_id, 'tournament_id': tournament_id})
             if len(games_saved) == len(games):
-                self.update_state(state='PROGRESS', meta={'current': 37, 'total': 38, 'status': 'Dados já existem no MongoDB'})
+                report_progress(self, lock_key, {'current': 37, 'total': 38, 'status': 'Dados já existem no MongoDB'})
             else:
                 loader.insert_data(games, collection)
-                self.update_state(state='PROGRESS', meta={'current': 37, 'total': 38, 'status': 'Dados salvos no MongoDB'})
-            loader.desconnect()
-            
-            # Limpa ObjectIds do MongoDB para que os dados sejam JSON serializáveis
-            games = clean_mongodb_ids(games)
+                report_progress(self, lock_key, {'current': 37, 'total': 38, 'status': 'Dados salvos no MongoDB'})
         
         return {
             'status': 'completed',
@@ -83,32 +190,41 @@ def extract_games_by_season_task(self, season_id: int, tournament_id: int, colle
     except Exception as e:
         self.update_state(state='FAILURE', meta={'error': str(e)})
         raise
+    finally:
+        task_lock.release(lock_key, self.request.id)
 
 
-@celery_app.task(bind=True, name='extract_all_games')
+@celery_app.task(bind=True, name='extract_all_games', time_limit=BACKFILL_TIME_LIMIT, soft_time_limit=BACKFILL_SOFT_TIME_LIMIT)
 def extract_all_games_task(
     self,
     slug_tournament: str,
     tournament_id: int,
     country: str = "brazil",
     collection: str = "games",
-    length_tournaments: Optional[Union[int, List[int]]] = None
+    length_tournaments: Optional[Union[int, List[int]]] = None,
+    resume: bool = False
 ):
+    """Extrai todas as temporadas gravando cada página no MongoDB assim que é lida.
+
+    O progresso fica em um checkpoint no Redis; com resume=True a extração
+    pula as temporadas concluídas e retoma a interrompida da página seguinte.
+    """
+    lock_key = task_lock.seasons_lock_key(tournament_id, length_tournaments)
     try:
         # Atualiza progresso
-        self.update_state(state='PROGRESS', meta={'current': 0, 'total': 100, 'status': 'Iniciando extração...'})
+        report_progress(self, lock_key, {'current': 0, 'total': 100, 'status': 'Iniciando extração...'})
         
-        # Inicializa extractor
-        extractor = Extractor()
-        loader = Load()
+        extractor = get_extractor()
+        loader = get_loader()
         
-        competition_url = f"https://www.sofascore.com/pt/football/tournament/{country}/{slug_tournament}/{tournament_id}"
+        competition_url = f"{SOFASCORE_URL}/pt/football/tournament/{country}/{slug_tournament}/{tournament_id}"
         seasons = extractor.get_seasons(competition_url)
         total_seasons = len(seasons)
         
-        self.update_state(
-            state='PROGRESS', 
-            meta={
+        report_progress(
+            self,
+            lock_key,
+            {
                 'current': 5, 
                 'total': 100, 
                 'status': f'Encontradas {total_seasons} temporadas. Iniciando extração...'
@@ -119,9 +235,10 @@ def extract_all_games_task(
                 allowed_ids = set(length_tournaments)
                 seasons = [season for season in seasons if season['id'] in allowed_ids]
                 total_seasons = len(seasons)
-                self.update_state(
-                    state='PROGRESS',
-                    meta={
+                report_progress(
+                    self,
+                    lock_key,
+                    {
                         'current': 5,
                         'total': 100,
                         'status': f'Filtrando para {total_seasons} temporadas específicas...'
@@ -130,60 +247,95 @@ def extract_all_games_task(
             else:
                 seasons = seasons[:length_tournaments]
                 total_seasons = len(seasons)
-                self.update_state(
-                    state='PROGRESS', 
-                    meta={
+                report_progress(
+                    self,
+                    lock_key,
+                    {
                         'current': 5, 
                         'total': 100, 
                         'status': f'Limitando a {total_seasons} temporadas para pesquisar...'
                     }
                 )
+        checkpoint = ExtractionCheckpoint(tournament_id, collection)
+        if not resume:
+            checkpoint.clear()
+        completed_seasons = checkpoint.completed_seasons()
+
         games = []
-        for season in seasons:
-            extracted_games = extractor.get_games_by_season(tournament_id, season['id'])
-            games_saved = loader.read_data(collection, {'season': season['id'], 'tournament_id': tournament_id})
-            if len(games_saved) != len(extracted_games):
-                games.extend(extracted_games)
-        
-        self.update_state(
-            state='PROGRESS', 
-            meta={
-                'current': 90, 
-                'total': 100, 
-                'status': f'{len(games)} jogos extraídos de {total_seasons} temporadas'
+        skipped_seasons = 0
+        for index, season in enumerate(seasons, start=1):
+            season_id = season['id']
+            current = 5 + int(85 * (index - 1) / total_seasons)
+            if season_id in completed_seasons:
+                skipped_seasons += 1
+                continue
+
+            def flush_page(page, page_games):
+                # Grava a página e registra o checkpoint antes de seguir para a próxima
+                transformed = Transform(page_games, tournament_id).transform()
+                if transformed:
+                    loader.insert_data(transformed, collection)
+                    games.extend(transformed)
+                checkpoint.save_page(season_id, page)
+                report_progress(
+                    self,
+                    lock_key,
+                    {
+                        'current': current,
+                        'total': 100,
+                        'status': f'Temporada {index}/{total_seasons}: página {page} salva ({len(games)} jogos)'
+                    }
+                )
+
+            extractor.get_games_by_season(
+                tournament_id,
+                season_id,
+                start_page=checkpoint.next_page(season_id),
+                on_page=flush_page,
+                heartbeat=lambda: task_lock.refresh(lock_key, self.request.id)
+            )
+            checkpoint.complete_season(season_id)
+            report_progress(
+                self,
+                lock_key,
+                {
+                    'current': 5 + int(85 * index / total_seasons),
+                    'total': 100,
+                    'status': f'Temporada {index}/{total_seasons} extraída'
+                }
+            )
+
+        checkpoint.clear()
+        report_progress(
+            self,
+            lock_key,
+            {
+                'current': 95,
+                'total': 100,
+                'status': f'{len(games)} jogos processados e salvos no MongoDB de {total_seasons} temporadas'
             }
         )
         
-        # Aplica transformações se necessário
-        if games:
-            transformer = Transform(games, tournament_id)
-            games = transformer.transform()
-            self.update_state(state='PROGRESS', meta={'current': 92, 'total': 100, 'status': 'Dados transformados'})
-            
-            loader.insert_data(games, collection)
-            loader.desconnect()
-            self.update_state(state='PROGRESS', meta={'current': 95, 'total': 100, 'status': 'Dados salvos no MongoDB'})
-            
-            # Limpa ObjectIds do MongoDB para que os dados sejam JSON serializáveis
-            games = clean_mongodb_ids(games)
-        
         return {
             'status': 'completed',
             'total_seasons': total_seasons,
+            'skipped_seasons': skipped_seasons,
             'total_games': len(games),
             'games': games
         }
     except Exception as e:
         self.update_state(state='FAILURE', meta={'error': str(e)})
         raise
+    finally:
+        task_lock.release(lock_key, self.request.id)
 
 
-@celery_app.task(bind=True, name='get_seasons')
+@celery_app.task(bind=True, name='get_seasons', time_limit=INTERACTIVE_TIME_LIMIT, soft_time_limit=INTERACTIVE_SOFT_TIME_LIMIT)
 def get_seasons_task(self, slug_tournament: str, id_tournament: int, country: str):
     try:
         self.update_state(state='PROGRESS', meta={'status': 'Buscando temporadas...'})
-        extractor = Extractor()
-        competition_url = f"https://www.sofascore.com/pt/football/tournament/{country}/{slug_tournament}/{id_tournament}"
+        extractor = get_extractor()
+        competition_url = f"{SOFASCORE_URL}/pt/football/tournament/{country}/{slug_tournament}/{id_tournament}"
         seasons = extractor.get_seasons(competition_url)
         return {
             'status': 'completed',
@@ -192,3 +344,38 @@ def get_seasons_task(self, slug_tournament: str, id_tournament: int, country: st
     except Exception as e:
         self.update_state(state='FAILURE', meta={'error': str(e)})
         raise
+
+
+
+@celery_app.task(bind=True, name='discover_live_events', time_limit=INTERACTIVE_TIME_LIMIT, soft_time_limit=INTERACTIVE_SOFT_TIME_LIMIT)
+def discover_live_events_task(self):
+    tracked = LiveRefresh(get_extractor(), loader=None).discover()
+    return {'status': 'completed', 'new_events': tracked}
+
+
+@celery_app.task(bind=True, name='poll_live_events', time_limit=INTERACTIVE_TIME_LIMIT, soft_time_limit=INTERACTIVE_SOFT_TIME_LIMIT)
+def poll_live_events_task(self):
+    # Evita dois polls simultâneos caso um tick demore mais que o intervalo
+    lock_key = 'lock:live:poll'
+    if task_lock.acquire(lock_key, self.request.id, celery_app, ttl=task_lock.LOCK_HEARTBEAT_TTL) is not None:
+        return {'status': 'skipped'}
+    try:
+        summary = LiveRefresh(get_extractor(), get_loader()).poll()
+        return {'status': 'completed', **summary}
+    finally:
+        task_lock.release(lock_key, self.request.id)
+
+
+@celery_app.task(bind=True, name='backfill_team_ids', time_limit=BACKFILL_TIME_LIMIT, soft_time_limit=BACKFILL_SOFT_TIME_LIMIT)
+def backfill_team_ids_task(self, collection: str):
+    """Preenche os ids das equipes em jogos salvos antes da dimensão de times."""
+    updated = get_loader().backfill_team_ids(collection)
+    return {'status': 'completed', 'collection': collection, 'updated_games': updated}
+
+
+@celery_app.task(bind=True, name='build_similarity_index', time_limit=BACKFILL_TIME_LIMIT, soft_time_limit=BACKFILL_SOFT_TIME_LIMIT)
+def build_similarity_index_task(self, collection: str):
+    """Recria o índice de similaridade da coleção a partir dos jogos salvos no MongoDB."""
+    games = get_loader().database.get_collection(collection).find({}, {'id': 1, 'stats': 1})
+    indexed = get_similarity_index(collection).rebuild(games)
+    return {'status': 'completed', 'collection': collection, 'indexed_games': indexed}
@@ -0,0 +1,51 @@
+"""Checkpoints de extrações longas (várias temporadas) guardados no Redis.
+
+Para cada temporada o hash guarda a última página já gravada no MongoDB ou
+"done" quando a temporada terminou. Uma extração retomada pula as temporadas
+concluídas e continua a temporada interrompida a partir da página seguinte.
+"""
+import os
+from typing import Optional, Set
+
+from redis_client import get_redis
+
+# Validade do checkpoint sem atualizações (segundos); padrão de 7 dias
+CHECKPOINT_TTL = int(os.getenv('CHECKPOINT_TTL', 7 * 24 * 3600))
+
+_DONE = 'done'
+
+
+class ExtractionCheckpoint:
+
+    def __init__(self, tournament_id: int, collection: str):
+        self.key = f"checkpoint:extract:{tournament_id}:{collection}"
+        self.redis = get_redis()
+
+    def completed_seasons(self) -> Set[int]:
+        return {
+            int(field.split(':', 1)[1])
+            for field, value in self.redis.hgetall(self.key).items()
+            if value == _DONE
+        }
+
+    def next_page(self, season_id: int) -> Optional[int]:
+        """Página em que a extração da temporada deve recomeçar (None se não há checkpoint)."""
+        value = self.redis.hget(self.key, f"season:{season_id}")
+        if value is None or value == _DONE:
+            return None
+        return int(value) + 1
+
+    def save_page(self, season_id: int, page: int):
+        self.__save(season_id, page)
+
+    def complete_season(self, season_id: int):
+        self.__save(season_id, _DONE)
+
+    def clear(self):
+        self.redis.delete(self.key)
+
+    def __save(self, season_id, value):
+        pipeline = self.redis.pipeline()
+        pipeline.hset(self.key, f"season:{season_id}", value)
+        pipeline.expire(self.key, CHECKPOINT_TTL)
+        pipeline.execute()
@@ -1,14 +1,77 @@
-import requests, json
-from bs4 import BeautifulSoup
+import requests, json, os, re, time
+from threading import Lock
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from etl.game_record import GameRecord
+
+# Endereço base do SofaScore (pode apontar para um upstream local em testes de carga)
+SOFASCORE_URL = os.getenv('SOFASCORE_URL', 'https://www.sofascore.com').rstrip('/')
+
+# Validade (segundos) do cache de temporadas por torneio
+SEASONS_CACHE_TTL = int(os.getenv('SEASONS_CACHE_TTL', 3600))
+
+# Pool de conexões HTTP (keep-alive) com o SofaScore
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', 2))
+# Intervalo para renovar os cookies obtidos na home
+WARM_UP_TTL = int(os.getenv('WARM_UP_TTL', 1800))
+
+_seasons_cache = {}
+_seasons_cache_lock = Lock()
+
+_NEXT_DATA_OPEN = re.compile(r'<script[^>]*id="__NEXT_DATA__"[^>]*>')
+_SCRIPT_CLOSE = '</script>'
+
+
+def create_session():
+    """Cria uma sessão HTTP com pool de conexões reaproveitáveis e retry em falhas de conexão."""
+    session = requests.Session()
+    retry = Retry(total=HTTP_RETRIES, connect=HTTP_RETRIES, read=HTTP_RETRIES, status=0, backoff_factor=0.3)
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def find_next_data(chunks):
+    """Procura o conteúdo da tag <script id="__NEXT_DATA__"> em um fluxo de texto.
+
+    Lê os pedaços só até o fechamento da tag, sem montar a árvore HTML.
+    Retorna None se a tag não for encontrada.
+    """
+    buffer = ''
+    opened = False
+    for chunk in chunks:
+        buffer += chunk
+        if not opened:
+            match = _NEXT_DATA_OPEN.search(buffer)
+            if match is None:
+                # Mantém o final do buffer caso a tag esteja dividida entre dois pedaços
+                buffer = buffer[-256:]
+                continue
+            buffer = buffer[match.end():]
+            opened = True
+        end = buffer.find(_SCRIPT_CLOSE)
+        if end >= 0:
+            return buffer[:end]
+    return None
+
 
 class Extractor:
     
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, session=None):
+        self.session = session if session is not None else create_session()
+        self._warmed_up_at = 0.0
+
+    def _warm_up(self):
+        """Visita a home para obter os cookies do SofaScore, no máximo a cada WARM_UP_TTL segundos."""
+        if time.time() - self._warmed_up_at > WARM_UP_TTL:
+            self.session.get(f"{SOFASCORE_URL}/pt/")
+            self._warmed_up_at = time.time()
 
     def get_tournaments(self, category="football"):
-        self.session.get("https://www.sofascore.com/pt/")
-        response = self.session.get(f"https://www.sofascore.com/api/v1/config/default-unique-tournaments/BR/{category}")
+        self._warm_up()
+        response = self.session.get(f"{SOFASCORE_URL}/api/v1/config/default-unique-tournaments/BR/{category}")
         data = response.json()
         tournaments = []
         for tournament in data['uniqueTournaments']:
@@ -22,46 +85,123 @@ class Extractor:
         return tournaments
     
     def get_seasons(self, competition_url):
-        self.session.get("https://www.sofascore.com/pt/")
-        response = self.session.get(competition_url)
-        soup = BeautifulSoup(response.text, "html.parser")
-        element = soup.find("script", {"id": "__NEXT_DATA__"})
-        dados = json.loads(element.text)
-        seasons = dados["props"]["pageProps"]["initialProps"]["seasons"]
+        """Retorna as temporadas do torneio, com cache por torneio.
+
+        Usa o endpoint JSON de temporadas quando disponível; caso contrário lê a
+        página do torneio em streaming só até a tag __NEXT_DATA__.
+        """
+        tournament_id = competition_url.rstrip('/').rsplit('/', 1)[-1]
+        with _seasons_cache_lock:
+            cached = _seasons_cache.get(tournament_id)
+        if cached is not None and cached[0] > time.time():
+            return cached[1]
+
+        self._warm_up()
+        seasons = None
+        if tournament_id.isdigit():
+            seasons = self.__get_seasons_from_api(tournament_id)
+        if seasons is None:
+            seasons = self.__get_seasons_from_page(competition_url)
+
+        with _seasons_cache_lock:
+            _seasons_cache[tournament_id] = (time.time() + SEASONS_CACHE_TTL, seasons)
         return seasons
+
+    def __get_seasons_from_api(self, tournament_id):
+        response = self.session.get(f"{SOFASCORE_URL}/api/v1/unique-tournament/{tournament_id}/seasons")
+        if response.status_code != 200:
+            return None
+        return response.json().get('seasons')
+
+    def __get_seasons_from_page(self, competition_url):
+        with self.session.get(competition_url, stream=True) as response:
+            response.encoding = response.encoding or 'utf-8'
+            content = find_next_data(response.iter_content(chunk_size=16384, decode_unicode=True))
+        if content is None:
+            raise ValueError(f"Tag __NEXT_DATA__ não encontrada em {competition_url}")
+        dados = json.loads(content)
+        return dados["props"]["pageProps"]["initialProps"]["seasons"]
     
-    def __get_game_stats(self, game_id):
-        response = self.session.get(f"https://www.sofascore.com/api/v1/event/{game_id}/statistics")
+    def get_game_stats(self, game_id):
+        response = self.session.get(f"{SOFASCORE_URL}/api/v1/event/{game_id}/statistics")
         statistics = response.json()
         return statistics['statistics'][0]['groups']
+
+    def get_event(self, event_id):
+        response = self.session.get(f"{SOFASCORE_URL}/api/v1/event/{event_id}")
+        response.raise_for_status()
+        return response.json()['event']
+
+    def get_scheduled_events(self, category, date):
+        """Eventos agendados de uma categoria em uma data (YYYY-MM-DD)."""
+        response = self.session.get(f"{SOFASCORE_URL}/api/v1/sport/{category}/scheduled-events/{date}")
+        if response.status_code != 200:
+            return []
+        return response.json().get('events', [])
     
-    def get_games_by_season(self, tournament_id, season_id):
+    def get_games_by_season(self, tournament_id, season_id, raw=False, start_page=None, on_page=None, heartbeat=None):
+        """Extrai os jogos encerrados de uma temporada.
+
+        Por padrão cada jogo é projetado em um GameRecord compacto assim que a
+        página é lida; com raw=True retorna o dict completo do evento.
+
+        Para extrações com checkpoint, start_page define a página inicial e
+        on_page(page, games) é chamado após cada página. Nesse modo, erros e
+        respostas diferentes de 404 são propagados em vez de encerrar a
+        temporada silenciosamente.
+
+        heartbeat() é chamado a cada página e a cada jogo lido (ex.: para renovar
+        o lock da task durante o download) sem mudar o tratamento de erros.
+        """
         tag = 'round'
         games = []
         index = 1
-        response = self.session.get(f"https://www.sofascore.com/api/v1/unique-tournament/{tournament_id}/season/{season_id}/events/{tag}/{index}")
-        if response.status_code != 200:
+        if start_page is not None:
             tag = 'last'
-            index = 0
+            index = start_page
+        else:
+            response = self.session.get(f"{SOFASCORE_URL}/api/v1/unique-tournament/{tournament_id}/season/{season_id}/events/{tag}/{index}")
+            if response.status_code != 200:
+                tag = 'last'
+                index = 0
         while True:
             try:
-                response = self.session.get(f"https://www.sofascore.com/api/v1/unique-tournament/{tournament_id}/season/{season_id}/events/last/{index}")
+                if heartbeat is not None:
+                    heartbeat()
+                response = self.session.get(f"{SOFASCORE_URL}/api/v1/unique-tournament/{tournament_id}/season/{season_id}/events/last/{index}")
                 if response.status_code != 200:
+                    if on_page is not None and response.status_code != 404:
+                        response.raise_for_status()
                     break
                 data = response.json()
+                page_games = []
                 for game in data['events']:
-                    game_info = game
                     if 'current' not in list(game['homeScore'].keys()) and 'current' not in list(game['awayScore'].keys()):
                         continue
+                    if heartbeat is not None:
+                        heartbeat()
+                    if not raw:
+                        try:
+                            stats = self.get_game_stats(game['id'])
+                        except (KeyError, IndexError):
+                            stats = None
+                        page_games.append(GameRecord.from_event(game, season_id, index, stats))
+                        continue
+                    game_info = game
                     try:
                         game_info['season_id'] = season_id
-                        game_info['stats'] = self.__get_game_stats(game['id'])
+                        game_info['stats'] = self.get_game_stats(game['id'])
                         game_info['round'] = index
                     except (KeyError, IndexError):
                         game_info['stats'] = None
-                    games.append(game_info)
+                    page_games.append(game_info)
+                games.extend(page_games)
+                if on_page is not None:
+                    on_page(index, page_games)
                 index += 1
             except Exception as e:
                 print(f"Erro ao extrair jogos para {tag} {index}: {str(e)}")
+                if on_page is not None:
+                    raise
                 break
         return games
\ No newline at end of file
@@ -0,0 +1,54 @@
+class GameRecord:
+    """Projeção compacta de um evento do SofaScore.
+
+    Guarda apenas os campos usados por Transform, em vez do dict bruto do
+    evento (torneio, estádio, cores dos times, timestamps etc.).
+
+    `round` é o índice da página de /events/last/{index} em que o jogo foi
+    lido por Extractor.get_games_by_season; a rodada do campeonato informada
+    pelo SofaScore (roundInfo.round) fica em `round_number`.
+    """
+
+    __slots__ = (
+        'id', 'season_id', 'round', 'round_number', 'home_team', 'away_team', 'home_team_id', 'away_team_id',
+        'home_score', 'away_score', 'stats'
+    )
+
+    def __init__(self, id, season_id, round, home_team, away_team, home_score, away_score, stats=None,
+                 home_team_id=None, away_team_id=None, round_number=None):
+        self.id = id
+        self.season_id = season_id
+        self.round = round
+        self.round_number = round_number
+        self.home_team = home_team
+        self.away_team = away_team
+        self.home_team_id = home_team_id
+        self.away_team_id = away_team_id
+        self.home_score = home_score
+        self.away_score = away_score
+        self.stats = stats
+
+    @classmethod
+    def from_event(cls, event, season_id, round, stats=None):
+        """Projeta um evento bruto da API do SofaScore."""
+        return cls(
+            id=event['id'],
+            season_id=season_id,
+            round=round,
+            round_number=event.get('roundInfo', {}).get('round'),
+            home_team=event['homeTeam']['name'],
+            away_team=event['awayTeam']['name'],
+            home_team_id=event['homeTeam'].get('id'),
+            away_team_id=event['awayTeam'].get('id'),
+            home_score=event['homeScore'].get('current'),
+            away_score=event['awayScore'].get('current'),
+            stats=stats,
+        )
+
+    @classmethod
+    def from_raw(cls, game):
+        """Projeta um evento bruto já enriquecido com season_id, round e stats (modo raw)."""
+        return cls.from_event(game, game['season_id'], game.get('round'), game.get('stats'))
+
+    def __repr__(self):
+        return f"GameRecord(id={self.id}, season_id={self.season_id}, round={self.round}, {self.home_team} x {self.away_team})"
@@ -0,0 +1,332 @@
+"""Réplica local (SQLite) dos jogos e equipes, para leituras sem latência de rede.
+
+Os jogos de cada coleção são copiados do MongoDB de forma incremental (campo
+updated_at, gravado pelo Load) e também podem ser gravados diretamente pelo
+Load após cada carga. Cada coleção tem uma versão, incrementada sempre que
+jogos novos ou alterados chegam à réplica, e o horário da última sincronização
+com o MongoDB; a API expõe os dois para o cliente saber o quão atual é a leitura.
+
+Suporta as consultas usadas pela API (igualdade em campos de nível superior,
+combinadas com $or/$and). Outras consultas levantam UnsupportedQuery e devem
+ser feitas no MongoDB.
+"""
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from etl.load import normalize_team_name
+
+LOCAL_REPLICA_PATH = os.getenv('LOCAL_REPLICA_PATH')
+LOCAL_REPLICA_COLLECTIONS = [
+    collection.strip()
+    for collection in os.getenv('LOCAL_REPLICA_COLLECTIONS', 'football').split(',')
+    if collection.strip()
+]
+LOCAL_REPLICA_SYNC_INTERVAL = float(os.getenv('LOCAL_REPLICA_SYNC_INTERVAL', 30))
+# Réplica sem sincronizar há mais tempo que isso deixa de ser usada (leituras voltam ao MongoDB)
+LOCAL_REPLICA_MAX_LAG = float(os.getenv('LOCAL_REPLICA_MAX_LAG', 10 * LOCAL_REPLICA_SYNC_INTERVAL))
+# Janela relida a cada sincronização, cobrindo escritas concorrentes e diferenças de relógio
+LOCAL_REPLICA_SYNC_OVERLAP = float(os.getenv('LOCAL_REPLICA_SYNC_OVERLAP', 60))
+LOCAL_REPLICA_BATCH_SIZE = int(os.getenv('LOCAL_REPLICA_BATCH_SIZE', 1000))
+
+# Campos com coluna própria (e índices); os demais são lidos do JSON do documento
+_COLUMNS = ('id', 'season', 'tournament_id', 'round', 'home_team', 'away_team',
+            'home_team_id', 'away_team_id', 'home_score', 'away_score', 'updated_at')
+_FIELD_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    collection TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    season INTEGER,
+    tournament_id INTEGER,
+    round INTEGER,
+    home_team TEXT,
+    away_team TEXT,
+    home_team_id INTEGER,
+    away_team_id INTEGER,
+    home_score REAL,
+    away_score REAL,
+    updated_at REAL,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (collection, id)
+);
+CREATE INDEX IF NOT EXISTS games_season ON games (collection, season, tournament_id);
+CREATE INDEX IF NOT EXISTS games_tournament ON games (collection, tournament_id);
+CREATE INDEX IF NOT EXISTS games_team_ids ON games (collection, home_team_id, away_team_id);
+CREATE INDEX IF NOT EXISTS games_away_team_id ON games (collection, away_team_id);
+CREATE INDEX IF NOT EXISTS games_team_names ON games (collection, home_team, away_team);
+CREATE INDEX IF NOT EXISTS games_away_team ON games (collection, away_team);
+CREATE TABLE IF NOT EXISTS team_aliases (
+    alias_key TEXT NOT NULL,
+    team_id INTEGER NOT NULL,
+    PRIMARY KEY (alias_key, team_id)
+);
+CREATE TABLE IF NOT EXISTS replica_state (
+    collection TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    synced_at REAL,
+    watermark REAL
+);
+"""
+
+
+class UnsupportedQuery(ValueError):
+    pass
+
+
+def _field_sql(field: str) -> str:
+    if not _FIELD_NAME.match(field):
+        raise UnsupportedQuery(f"Filtro não suportado pela réplica local: {field}")
+    return field if field in _COLUMNS else f"json_extract(doc, '$.{field}')"
+
+
+def _is_scalar(value) -> bool:
+    return not isinstance(value, (dict, list))
+
+
+def _where(query: Dict, params: List) -> str:
+    clauses = []
+    for field, value in query.items():
+        if field in ('$or', '$and'):
+            if not isinstance(value, list) or not value:
+                raise UnsupportedQuery(f"{field} precisa de uma lista de condições")
+            if field == '$or':
+                clauses.append(_or_clause(value, params))
+                continue
+            clauses.append('(' + ' AND '.join(_where(condition, params) for condition in value) + ')')
+            continue
+        if not _is_scalar(value):
+            raise UnsupportedQuery(f"Filtro não suportado pela réplica local: {field}")
+        clauses.append(f"{_field_sql(field)} = ?")
+        params.append(value)
+    return ' AND '.join(clauses) if clauses else '1 = 1'
+
+
+def _or_clause(conditions: List, params: List) -> str:
+    """$or com as igualdades agrupadas por campos: cada grupo vira um único IN.
+
+    Uma cadeia longa de OR (ex.: centenas de confrontos do batch de /versus)
+    estoura o limite de profundidade de expressões do SQLite.
+    """
+    groups = {}
+    others = []
+    for condition in conditions:
+        if (isinstance(condition, dict) and condition
+                and not any(field.startswith('$') for field in condition)
+                and all(_is_scalar(value) for value in condition.values())):
+            groups.setdefault(tuple(condition), []).append(condition)
+        elif isinstance(condition, dict):
+            others.append(condition)
+        else:
+            raise UnsupportedQuery("$or precisa de uma lista de condições")
+
+    terms = []
+    for fields, group in groups.items():
+        columns = ', '.join(_field_sql(field) for field in fields)
+        if len(fields) == 1:
+            params.extend(condition[fields[0]] for condition in group)
+            terms.append(f"{columns} IN ({', '.join('?' * len(group))})")
+            continue
+        # O IN do primeiro campo deixa o SQLite usar o índice; o IN por linha filtra os pares exatos
+        first_values = list(dict.fromkeys(condition[fields[0]] for condition in group))
+        params.extend(first_values)
+        for condition in group:
+            params.extend(condition[field] for field in fields)
+        row = '(' + ', '.join('?' * len(fields)) + ')'
+        terms.append(f"({_field_sql(fields[0])} IN ({', '.join('?' * len(first_values))}) "
+                     f"AND ({columns}) IN (VALUES {', '.join([row] * len(group))}))")
+    terms.extend(_where(condition, params) for condition in others)
+    return '(' + ' OR '.join(terms) + ')'
+
+
+class LocalReplica:
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self.__connection() as connection:
+            connection.executescript(_SCHEMA)
+
+    # Leitura (mesma interface do Load)
+
+    def read_data(self, collection, query={}):
+        params = [collection]
+        where = _where(query, params)
+        rows = self.__connection().execute(
+            f"SELECT doc FROM games WHERE collection = ? AND {where}", params
+        ).fetchall()
+        return [json.loads(doc) for doc, in rows]
+
+    def resolve_teams(self, values):
+        """Resolve ids ou nomes/apelidos de equipes para ids do SofaScore (como Load.resolve_teams)."""
+        resolved = {}
+        keys = {}
+        for value in values:
+            if isinstance(value, int) or str(value).isdigit():
+                resolved[value] = int(value)
+            else:
+                keys.setdefault(normalize_team_name(value), []).append(value)
+        if keys:
+            rows = self.__connection().execute(
+                f"SELECT alias_key, team_id FROM team_aliases WHERE alias_key IN ({', '.join('?' * len(keys))})",
+                list(keys),
+            ).fetchall()
+            for key, team_id in rows:
+                for value in keys[key]:
+                    resolved.setdefault(value, team_id)
+        return resolved
+
+    # Estado / marcador de versão
+
+    def state(self, collection) -> Optional[Dict]:
+        row = self.__connection().execute(
+            "SELECT version, synced_at, watermark FROM replica_state WHERE collection = ?", (collection,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'version': row[0], 'synced_at': row[1], 'watermark': row[2]}
+
+    def is_fresh(self, collection, max_lag: float = LOCAL_REPLICA_MAX_LAG) -> bool:
+        """A coleção já foi copiada por completo e sincronizada há menos de max_lag segundos."""
+        state = self.state(collection)
+        return bool(state and state['synced_at'] and time.time() - state['synced_at'] <= max_lag)
+
+    def marker(self, collection) -> Dict:
+        state = self.state(collection) or {}
+        return {'source': 'local', 'version': state.get('version', 0), 'synced_at': state.get('synced_at')}
+
+    # Escrita
+
+    def upsert_games(self, collection, games: Iterable[Dict]) -> int:
+        """Grava (insere ou substitui) jogos e os nomes das equipes; incrementa a versão se algo mudou."""
+        rows = []
+        aliases = set()
+        for game in games:
+            doc = {key: value for key, value in game.items() if key != '_id'}
+            if '_id' in game:
+                doc['_id'] = str(game['_id'])
+            rows.append((collection, *(doc.get(column) for column in _COLUMNS), json.dumps(doc, default=str, sort_keys=True)))
+            for side in ('home', 'away'):
+                if doc.get(f'{side}_team_id') is not None and doc.get(f'{side}_team'):
+                    aliases.add((normalize_team_name(doc[f'{side}_team']), doc[f'{side}_team_id']))
+        if not rows:
+            return 0
+        columns = ', '.join(_COLUMNS)
+        updates = ', '.join(f'{column} = excluded.{column}' for column in _COLUMNS[1:])
+        with self.__connection() as connection:
+            before = connection.total_changes
+            connection.executemany(
+                f"INSERT INTO games (collection, {columns}, doc) VALUES (?, {', '.join('?' * len(_COLUMNS))}, ?) "
+                f"ON CONFLICT (collection, id) DO UPDATE SET {updates}, doc = excluded.doc "
+                f"WHERE games.doc != excluded.doc",
+                rows,
+            )
+            changed = connection.total_changes - before
+            connection.executemany("INSERT OR IGNORE INTO team_aliases (alias_key, team_id) VALUES (?, ?)", aliases)
+            if changed:
+                connection.execute(
+                    "INSERT INTO replica_state (collection, version) VALUES (?, 1) "
+                    "ON CONFLICT (collection) DO UPDATE SET version = version + 1",
+                    (collection,),
+                )
+        return changed
+
+    def upsert_team_docs(self, teams: Iterable[Dict]):
+        """Copia documentos da coleção teams do MongoDB ({_id, alias_keys})."""
+        rows = [(key, team['_id']) for team in teams for key in team.get('alias_keys', [])]
+        with self.__connection() as connection:
+            connection.executemany("INSERT OR IGNORE INTO team_aliases (alias_key, team_id) VALUES (?, ?)", rows)
+
+    def sync_from_mongo(self, database, collection, teams_collection='teams') -> int:
+        """Copia do MongoDB os jogos alterados desde a última sincronização (todos, na primeira vez)."""
+        started_at = time.time()
+        state = self.state(collection) or {}
+        query = {}
+        if state.get('watermark') is not None:
+            query = {'updated_at': {'$gte': state['watermark'] - LOCAL_REPLICA_SYNC_OVERLAP}}
+
+        changed = 0
+        watermark = state.get('watermark')
+        batch = []
+        for game in database.get_collection(collection).find(query).batch_size(LOCAL_REPLICA_BATCH_SIZE):
+            batch.append(game)
+            if game.get('updated_at') is not None:
+                watermark = max(watermark or 0, game['updated_at'])
+            if len(batch) >= LOCAL_REPLICA_BATCH_SIZE:
+                changed += self.upsert_games(collection, batch)
+                batch = []
+        changed += self.upsert_games(collection, batch)
+
+        if changed:
+            # Equipes só mudam junto com jogos novos
+            self.upsert_team_docs(database.get_collection(teams_collection).find({}, {'alias_keys': 1}))
+        with self.__connection() as connection:
+            connection.execute(
+                "INSERT INTO replica_state (collection, synced_at, watermark) VALUES (?, ?, ?) "
+                "ON CONFLICT (collection) DO UPDATE SET synced_at = excluded.synced_at, watermark = excluded.watermark",
+                # Sem updated_at em nenhum jogo (base antiga), a próxima sincronização parte do início desta
+                (collection, started_at, watermark if watermark is not None else started_at),
+            )
+        return changed
+
+    def __connection(self) -> sqlite3.Connection:
+        # Uma conexão por thread; WAL permite leituras durante a sincronização
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+
+_replica = None
+
+
+def get_local_replica() -> Optional[LocalReplica]:
+    """Réplica compartilhada do processo; None se LOCAL_REPLICA_PATH não estiver definido."""
+    global _replica
+    if _replica is None and LOCAL_REPLICA_PATH:
+        _replica = LocalReplica(LOCAL_REPLICA_PATH)
+    return _replica
+
+
+class ReplicaSyncer:
+    """Sincroniza periodicamente a réplica local com o MongoDB (task asyncio, como o HealthMonitor)."""
+
+    def __init__(self, replica: LocalReplica, database, collections=LOCAL_REPLICA_COLLECTIONS,
+                 interval: float = LOCAL_REPLICA_SYNC_INTERVAL):
+        self.replica = replica
+        self.database = database
+        self.collections = collections
+        self.interval = interval
+        self._task = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self.__loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def sync_now(self):
+        for collection in self.collections:
+            changed = await asyncio.to_thread(self.replica.sync_from_mongo, self.database, collection)
+            if changed:
+                print(f"Réplica local: {changed} jogos atualizados em '{collection}'")
+
+    async def __loop(self):
+        while True:
+            try:
+                await self.sync_now()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Erro ao sincronizar a réplica local: {str(e)}")
+            await asyncio.sleep(self.interval)
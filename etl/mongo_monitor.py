@@ -0,0 +1,221 @@
+"""Monitoramento dos comandos enviados ao MongoDB (pymongo command monitoring).
+
+Para cada comando registra duração e documentos retornados, agregados por
+"formato" da consulta (coleção, comando, campos do filtro e da ordenação, sem
+os valores). Comandos acima de MONGO_SLOW_MS são logados com o filtro e o
+tamanho da resposta e, se MONGO_EXPLAIN_SLOW estiver ativo, o plano do
+explain() é obtido em uma thread separada, sem atrasar a requisição que
+originou o comando.
+
+Medir os bytes exige recodificar a resposta (~8 ms por MB), então por padrão
+isso só é feito nos comandos lentos; MONGO_MEASURE_ALL_BYTES=true mede todos.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import bson
+from bson import json_util
+from pymongo import monitoring
+
+MONGO_COMMAND_MONITORING = os.getenv('MONGO_COMMAND_MONITORING', 'true').lower() == 'true'
+MONGO_SLOW_MS = float(os.getenv('MONGO_SLOW_MS', 100))
+MONGO_EXPLAIN_SLOW = os.getenv('MONGO_EXPLAIN_SLOW', 'false').lower() == 'true'
+MONGO_MEASURE_ALL_BYTES = os.getenv('MONGO_MEASURE_ALL_BYTES', 'false').lower() == 'true'
+# Limite de formatos de consulta acompanhados (novos formatos são ignorados depois disso)
+MONGO_MAX_QUERY_SHAPES = int(os.getenv('MONGO_MAX_QUERY_SHAPES', 500))
+MONGO_SLOW_LOG_SIZE = int(os.getenv('MONGO_SLOW_LOG_SIZE', 50))
+
+# Comandos de leitura que aceitam explain
+_EXPLAINABLE = {'find', 'aggregate', 'count', 'distinct'}
+# Comandos internos do driver que não interessam ao relatório
+_IGNORED = {'explain', 'hello', 'ismaster', 'isMaster', 'ping', 'endSessions', 'saslStart', 'saslContinue', 'killCursors'}
+# Campos adicionados pelo driver que não fazem parte da consulta
+_DRIVER_FIELDS = {'lsid', '$db', '$clusterTime', '$readPreference', 'txnNumber', 'autocommit', 'apiVersion'}
+
+
+def query_shape(value):
+    """Substitui os valores de um filtro pelo nome do tipo, mantendo operadores e campos."""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # Listas de condições ($or/$and) mantêm a estrutura; listas de valores ($in) viram só o tipo
+        if value and all(isinstance(item, dict) for item in value):
+            return [query_shape(item) for item in value]
+        return '[...]'
+    return type(value).__name__
+
+
+def _collect_stages(plan, stages):
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        for key in ('inputStage', 'queryPlan'):
+            _collect_stages(plan.get(key), stages)
+        for child in plan.get('inputStages', []):
+            _collect_stages(child, stages)
+    return stages
+
+
+class CommandMonitor(monitoring.CommandListener):
+
+    def __init__(self, slow_ms: float = MONGO_SLOW_MS, explain_slow: bool = MONGO_EXPLAIN_SLOW,
+                 measure_all_bytes: bool = MONGO_MEASURE_ALL_BYTES):
+        self.slow_ms = slow_ms
+        self.explain_slow = explain_slow
+        self.measure_all_bytes = measure_all_bytes
+        # Client usado para o explain(); definido por create_mongo_client
+        self.client = None
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._shapes = {}
+        self._slow = deque(maxlen=MONGO_SLOW_LOG_SIZE)
+        self._explainer = None
+
+    # Callbacks do pymongo (chamados na thread que executou o comando)
+
+    def started(self, event):
+        if event.command_name in _IGNORED:
+            return
+        command = event.command
+        # getMore traz o id do cursor no campo do comando e a coleção em 'collection'
+        collection = command.get('collection') if event.command_name == 'getMore' else command.get(event.command_name)
+        query = command.get('filter', command.get('query', command.get('pipeline', {})))
+        key = (event.connection_id, event.request_id)
+        self._pending[key] = {
+            'database': event.database_name,
+            'collection': collection if isinstance(collection, str) else None,
+            'command_name': event.command_name,
+            'filter': query,
+            'sort': command.get('sort'),
+            'command': command,
+        }
+
+    def succeeded(self, event):
+        info = self._pending.pop((event.connection_id, event.request_id), None)
+        if info is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        # Tamanho só quando vale o custo da recodificação (comando lento ou medição completa ativa)
+        size = len(bson.encode(event.reply)) if self.measure_all_bytes or duration_ms >= self.slow_ms else None
+        self.__record(info, duration_ms, self.__documents(event.reply), size)
+
+    def failed(self, event):
+        info = self._pending.pop((event.connection_id, event.request_id), None)
+        if info is None:
+            return
+        self.__record(info, event.duration_micros / 1000, 0, None, failure=str(event.failure))
+
+    # Relatórios
+
+    def summary(self, limit: int = 10, sort: str = 'total_ms') -> dict:
+        """Formatos de consulta mais lentos (por total_ms, max_ms, avg_ms, count ou avg_bytes) e os últimos comandos lentos."""
+        with self._lock:
+            shapes = [dict(stats) for stats in self._shapes.values()]
+            slow = [dict(entry) for entry in self._slow]
+        for stats in shapes:
+            stats['avg_ms'] = round(stats['total_ms'] / stats['count'], 3)
+            stats['avg_bytes'] = stats['bytes'] // stats['bytes_measured'] if stats['bytes_measured'] else None
+            stats['total_ms'] = round(stats['total_ms'], 3)
+            stats['max_ms'] = round(stats['max_ms'], 3)
+        shapes.sort(key=lambda stats: stats[sort] or 0, reverse=True)
+        return {
+            'slow_ms': self.slow_ms,
+            'shapes_count': len(shapes),
+            'shapes': shapes[:limit],
+            'recent_slow': slow[::-1],
+        }
+
+    def reset(self):
+        with self._lock:
+            self._shapes.clear()
+            self._slow.clear()
+
+    def __record(self, info, duration_ms, documents, size, failure=None):
+        shape = {'filter': query_shape(info['filter'])}
+        if info['sort']:
+            shape['sort'] = dict(info['sort'])
+        shape_key = repr((info['database'], info['collection'], info['command_name'], shape))
+        slow = duration_ms >= self.slow_ms
+        with self._lock:
+            stats = self._shapes.get(shape_key)
+            if stats is None and len(self._shapes) < MONGO_MAX_QUERY_SHAPES:
+                stats = self._shapes[shape_key] = {
+                    'database': info['database'],
+                    'collection': info['collection'],
+                    'command': info['command_name'],
+                    'shape': shape,
+                    'count': 0,
+                    'failures': 0,
+                    'slow_count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'documents': 0,
+                    # Bytes somados apenas dos comandos medidos (bytes_measured)
+                    'bytes': 0,
+                    'bytes_measured': 0,
+                }
+            if stats is not None:
+                stats['count'] += 1
+                stats['failures'] += failure is not None
+                stats['slow_count'] += slow
+                stats['total_ms'] += duration_ms
+                stats['max_ms'] = max(stats['max_ms'], duration_ms)
+                stats['documents'] += documents
+                if size is not None:
+                    stats['bytes'] += size
+                    stats['bytes_measured'] += 1
+            if not slow:
+                return
+            entry = {
+                'at': time.time(),
+                'database': info['database'],
+                'collection': info['collection'],
+                'command': info['command_name'],
+                'filter': json_util.dumps(info['filter']),
+                'duration_ms': round(duration_ms, 3),
+                'documents': documents,
+                'bytes': size,
+            }
+            if failure is not None:
+                entry['error'] = failure
+            self._slow.append(entry)
+
+        print(f"MongoDB lento ({duration_ms:.1f}ms): {info['command_name']} {info['database']}.{info['collection']} "
+              f"filtro={entry['filter']} documentos={documents} bytes={size}")
+        if self.explain_slow and self.client is not None and info['command_name'] in _EXPLAINABLE:
+            self.__explain_in_background(info, entry)
+
+    def __explain_in_background(self, info, entry):
+        if self._explainer is None:
+            self._explainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='mongo-explain')
+        command = {key: value for key, value in info['command'].items() if key not in _DRIVER_FIELDS}
+        self._explainer.submit(self.__explain, info['database'], command, entry)
+
+    def __explain(self, database, command, entry):
+        try:
+            result = self.client[database].command('explain', command, verbosity='queryPlanner')
+            winning_plan = result.get('queryPlanner', {}).get('winningPlan', {})
+            stages = _collect_stages(winning_plan, [])
+            with self._lock:
+                entry['plan'] = stages
+            print(f"Plano da consulta lenta em {database}.{entry['collection']}: {' <- '.join(stages)}")
+        except Exception as e:
+            with self._lock:
+                entry['plan_error'] = str(e)
+            print(f"Erro ao obter explain da consulta lenta: {str(e)}")
+
+    @staticmethod
+    def __documents(reply) -> int:
+        cursor = reply.get('cursor')
+        if isinstance(cursor, dict):
+            return len(cursor.get('firstBatch', cursor.get('nextBatch', [])))
+        if 'values' in reply:
+            return len(reply['values'])
+        return int(reply.get('n', 0))
+
+
+# Monitor compartilhado pelos clients criados no processo
+command_monitor = CommandMonitor()
@@ -0,0 +1,269 @@
+"""Índice de similaridade entre jogos a partir das estatísticas de const/const_football.py.
+
+Cada categoria tem uma matriz (jogos x estatísticas de mandante e visitante)
+em um arquivo memory-mapped, mais o mapa linha -> id do jogo e um arquivo de
+metadados. A matriz guarda os valores brutos (NaN quando a estatística não
+existe no jogo); a normalização (z-score por coluna) é feita na consulta, de
+modo que novos jogos entram no índice sem reprocessar os anteriores.
+
+Escritas (Load após cada carga, ou a task de rebuild) usam um lock de arquivo;
+leitores recarregam o índice quando os metadados mudam.
+"""
+import fcntl
+import json
+import os
+import re
+import threading
+import warnings
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from const.const_football import DEFENDING, DUELS, GOALKEEPING, MATCH_OVER_VIEW, PASSES, SHOTS
+
+SIMILARITY_INDEX_PATH = os.getenv('SIMILARITY_INDEX_PATH', 'similarity_index')
+SIMILARITY_INITIAL_CAPACITY = int(os.getenv('SIMILARITY_INITIAL_CAPACITY', 1024))
+
+# Estatísticas usadas como features (sem repetição), cada uma com o valor do mandante e do visitante
+FEATURE_NAMES = list(dict.fromkeys(MATCH_OVER_VIEW + SHOTS + PASSES + DUELS + DEFENDING + GOALKEEPING))
+FEATURES = [f'{side}:{name}' for name in FEATURE_NAMES for side in ('home', 'away')]
+_FEATURE_INDEX = {name.lower(): index for index, name in enumerate(FEATURE_NAMES)}
+_CATEGORY_NAME = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+def game_features(game: Dict) -> np.ndarray:
+    """Vetor de features de um jogo salvo pelo Transform (NaN para estatísticas ausentes)."""
+    vector = np.full(len(FEATURES), np.nan, dtype=np.float32)
+    for group in game.get('stats') or []:
+        if not isinstance(group, dict):
+            continue
+        for items in group.values():
+            if not isinstance(items, list):
+                continue
+            for item in items:
+                if not isinstance(item, dict):
+                    continue
+                index = _FEATURE_INDEX.get(str(item.get('name', '')).lower())
+                if index is None:
+                    continue
+                for offset, key in enumerate(('homeValue', 'awayValue')):
+                    try:
+                        vector[2 * index + offset] = float(item[key])
+                    except (KeyError, TypeError, ValueError):
+                        pass
+    return vector
+
+
+class SimilarityIndex:
+
+    def __init__(self, category: str, path: str = SIMILARITY_INDEX_PATH):
+        # A categoria vira nome de arquivo
+        if not _CATEGORY_NAME.match(category):
+            raise ValueError(f"Categoria inválida para o índice de similaridade: {category}")
+        self.category = category
+        self._path = path
+        self.__set_base(os.path.join(path, category))
+        os.makedirs(path, exist_ok=True)
+        self._thread_lock = threading.Lock()
+        self.__reset()
+
+    # Consulta
+
+    def similar(self, game_id: int, k: int = 10) -> Optional[List[Dict]]:
+        """Os k jogos mais próximos (distância euclidiana nas features normalizadas); None se o jogo não está no índice."""
+        with self._thread_lock:
+            self.__reload_if_changed()
+            row = self._rows.get(game_id)
+            if row is None:
+                return None
+            normalized = self.__normalized()
+            distances = np.sqrt(((normalized - normalized[row]) ** 2).sum(axis=1))
+            distances[row] = np.inf
+            k = min(k, self._count - 1)
+            if k <= 0:
+                return []
+            nearest = np.argpartition(distances, k - 1)[:k]
+            nearest = nearest[np.argsort(distances[nearest])]
+            ids = self._ids[:self._count]
+            return [{'id': int(ids[index]), 'distance': float(distances[index])} for index in nearest]
+
+    def __len__(self):
+        with self._thread_lock:
+            self.__reload_if_changed()
+            return self._count
+
+    # Escrita
+
+    def upsert_games(self, games: Iterable[Dict]) -> int:
+        """Adiciona ou atualiza os jogos no índice (o id do jogo identifica a linha)."""
+        vectors = {game['id']: game_features(game) for game in games if game.get('stats')}
+        if not vectors:
+            return 0
+        with self._thread_lock, self.__file_lock():
+            self.__reload_if_changed()
+            new_ids = [game_id for game_id in vectors if game_id not in self._rows]
+            self.__ensure_capacity(self._count + len(new_ids))
+            for game_id in new_ids:
+                self._ids[self._count] = game_id
+                self._rows[game_id] = self._count
+                self._count += 1
+            for game_id, vector in vectors.items():
+                self._matrix[self._rows[game_id]] = vector
+            # Dados no disco antes dos metadados: leitores nunca veem linhas incompletas
+            self._matrix.flush()
+            self._ids.flush()
+            self.__write_meta()
+            self._normalized = None
+        return len(vectors)
+
+    def rebuild(self, games: Iterable[Dict]) -> int:
+        """Recria o índice do zero (ex.: após mudar as estatísticas de const_football).
+
+        O novo índice é montado em arquivos temporários e trocado pelo atual com
+        os.replace sem soltar o lock: outros processos continuam lendo o índice
+        antigo até os novos metadados aparecerem.
+        """
+        with self._thread_lock, self.__file_lock():
+            staging = SimilarityIndex(self.category, self._path)
+            staging.__set_base(f'{self._base}.rebuild')
+            staging.__remove_files()
+            total = 0
+            batch = []
+            for game in games:
+                batch.append(game)
+                if len(batch) >= SIMILARITY_INITIAL_CAPACITY:
+                    total += staging.upsert_games(batch)
+                    batch = []
+            total += staging.upsert_games(batch)
+            if total:
+                # Metadados por último: leitores só recarregam quando a matriz e os ids novos já estão no lugar
+                os.replace(staging._matrix_path, self._matrix_path)
+                os.replace(staging._ids_path, self._ids_path)
+                os.replace(staging._meta_path, self._meta_path)
+            else:
+                self.__remove_files()
+            if os.path.exists(staging._lock_path):
+                os.remove(staging._lock_path)
+            self.__reset()
+            self.__reload_if_changed()
+        return total
+
+    # Internos
+
+    def __normalized(self) -> np.ndarray:
+        # Cache da matriz normalizada até a próxima alteração do índice
+        if self._normalized is None:
+            matrix = np.asarray(self._matrix[:self._count], dtype=np.float32)
+            # Colunas sem nenhum valor (estatística nunca vista) geram avisos de fatia vazia
+            with warnings.catch_warnings(), np.errstate(invalid='ignore'):
+                warnings.simplefilter('ignore', RuntimeWarning)
+                mean = np.nanmean(matrix, axis=0)
+                std = np.nanstd(matrix, axis=0)
+            std[~(std > 0)] = 1.0
+            normalized = (matrix - np.nan_to_num(mean)) / std
+            # Estatística ausente conta como valor médio da coluna
+            self._normalized = np.nan_to_num(normalized, nan=0.0)
+        return self._normalized
+
+    def __reload_if_changed(self):
+        try:
+            mtime = os.stat(self._meta_path).st_mtime_ns
+        except FileNotFoundError:
+            # Índice removido (ou ainda não criado): descarta o estado carregado
+            if self._meta_mtime is not None:
+                self.__reset()
+            return
+        if mtime == self._meta_mtime:
+            return
+        with open(self._meta_path) as meta_file:
+            meta = json.load(meta_file)
+        if meta['features'] != FEATURES:
+            raise RuntimeError(f"Índice de similaridade de '{self.category}' foi criado com outras estatísticas; reconstrua o índice")
+        self.__open(meta['capacity'])
+        self._count = meta['count']
+        self._rows = {int(game_id): row for row, game_id in enumerate(self._ids[:self._count])}
+        self._meta_mtime = mtime
+        self._normalized = None
+
+    def __set_base(self, base: str):
+        self._base = base
+        self._matrix_path = f'{base}.f32'
+        self._ids_path = f'{base}.ids'
+        self._meta_path = f'{base}.json'
+        self._lock_path = f'{base}.lock'
+
+    def __reset(self):
+        self._meta_mtime = None
+        self._count = 0
+        self._capacity = 0
+        self._matrix = None
+        self._ids = None
+        self._rows: Dict[int, int] = {}
+        self._normalized = None
+
+    def __remove_files(self):
+        for file_path in (self._matrix_path, self._ids_path, self._meta_path):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def __open(self, capacity: int):
+        self._matrix = np.memmap(self._matrix_path, dtype=np.float32, mode='r+', shape=(capacity, len(FEATURES)))
+        self._ids = np.memmap(self._ids_path, dtype=np.int64, mode='r+', shape=(capacity,))
+        self._capacity = capacity
+
+    def __ensure_capacity(self, rows: int):
+        capacity = self._capacity
+        if rows <= capacity:
+            return
+        new_capacity = max(SIMILARITY_INITIAL_CAPACITY, capacity * 2)
+        while new_capacity < rows:
+            new_capacity *= 2
+        self._matrix = self._ids = None
+        # Aumenta os arquivos sem reescrever o conteúdo; linhas novas começam como NaN
+        row_bytes = len(FEATURES) * np.dtype(np.float32).itemsize
+        with open(self._matrix_path, 'ab') as matrix_file:
+            matrix_file.truncate(new_capacity * row_bytes)
+        with open(self._ids_path, 'ab') as ids_file:
+            ids_file.truncate(new_capacity * np.dtype(np.int64).itemsize)
+        self.__open(new_capacity)
+        self._matrix[capacity:] = np.nan
+
+    def __write_meta(self):
+        meta = {'count': self._count, 'capacity': self._capacity, 'features': FEATURES}
+        temp_path = f'{self._meta_path}.tmp'
+        with open(temp_path, 'w') as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(temp_path, self._meta_path)
+        self._meta_mtime = os.stat(self._meta_path).st_mtime_ns
+
+    def __file_lock(self):
+        return _FileLock(self._lock_path)
+
+
+class _FileLock:
+    """Lock exclusivo entre processos (workers e API) para as escritas no índice."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'w')
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+
+_indexes: Dict[str, SimilarityIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_similarity_index(category: str) -> SimilarityIndex:
+    """Índice compartilhado do processo para a categoria (coleção)."""
+    with _indexes_lock:
+        if category not in _indexes:
+            _indexes[category] = SimilarityIndex(category)
+        return _indexes[category]
@@ -1,4 +1,5 @@
 from const.const_football import MATCH_OVER_VIEW, SHOTS, PASSES, DUELS, DEFENDING, GOALKEEPING
+from etl.game_record import GameRecord
 
 class Transform:
 
@@ -9,19 +10,25 @@ class Transform:
     def transform(self):
         transformed_data = []
         for game in self.data:
-            if game['stats'] is not None:
+            # Aceita tanto GameRecord quanto o evento bruto (modo raw do Extractor)
+            if not isinstance(game, GameRecord):
+                game = GameRecord.from_raw(game)
+            if game.stats is not None:
                 transformed_data.append(self.__get_game_basic_info(game))
         return transformed_data
     
     def __get_game_basic_info(self, game):
         game_info = {}
-        game_info['season'] = game['season_id']
+        game_info['season'] = game.season_id
         game_info['tournament_id'] = self.tournament_id
-        game_info['round'] = game['round']
-        game_info['id'] = game['id']
-        game_info['home_team'] = game['homeTeam']['name']
-        game_info['away_team'] = game['awayTeam']['name']
-        game_info['home_score'] = game['homeScore']['current']
-        game_info['away_score'] = game['awayScore']['current']
-        game_info['stats'] = game['stats']
+        game_info['round'] = game.round
+        game_info['round_number'] = game.round_number
+        game_info['id'] = game.id
+        game_info['home_team'] = game.home_team
+        game_info['away_team'] = game.away_team
+        game_info['home_team_id'] = game.home_team_id
+        game_info['away_team_id'] = game.away_team_id
+        game_info['home_score'] = game.home_score
+        game_info['away_score'] = game.away_score
+        game_info['stats'] = game.stats
         return game_info
\ No newline at end of file
@@ -0,0 +1,74 @@
+"""Health checks em background para as probes de liveness/readiness.
+
+As dependências (Celery, Redis, MongoDB) são verificadas a cada intervalo por
+uma task asyncio; as probes apenas leem o último resultado em memória.
+"""
+import asyncio
+import os
+import time
+from typing import Callable, Dict
+
+HEALTH_CHECK_INTERVAL = float(os.getenv('HEALTH_CHECK_INTERVAL', 10))
+HEALTH_CHECK_TIMEOUT = float(os.getenv('HEALTH_CHECK_TIMEOUT', 3))
+# Resultado mais antigo que isso é considerado obsoleto (monitor travado)
+HEALTH_MAX_AGE = float(os.getenv('HEALTH_MAX_AGE', 3 * HEALTH_CHECK_INTERVAL))
+
+
+class HealthMonitor:
+
+    def __init__(self, checks: Dict[str, Callable[[], bool]], interval: float = HEALTH_CHECK_INTERVAL):
+        self.checks = checks
+        self.interval = interval
+        self._task = None
+        self._results = {name: {'ok': False, 'error': 'ainda não verificado'} for name in checks}
+        self._checked_at = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self.__loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    def snapshot(self) -> dict:
+        age = None if self._checked_at is None else time.time() - self._checked_at
+        return {
+            'ready': self.is_ready(),
+            'checked_at': self._checked_at,
+            'age_seconds': age,
+            'checks': self._results,
+        }
+
+    def is_ready(self) -> bool:
+        if self._checked_at is None or time.time() - self._checked_at > HEALTH_MAX_AGE:
+            return False
+        return all(result['ok'] for result in self._results.values())
+
+    async def check_now(self):
+        names = list(self.checks)
+        results = await asyncio.gather(*(self.__run(self.checks[name]) for name in names))
+        self._results = dict(zip(names, results))
+        self._checked_at = time.time()
+
+    async def __loop(self):
+        while True:
+            try:
+                await self.check_now()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Erro no health check: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    @staticmethod
+    async def __run(check: Callable[[], bool]) -> dict:
+        start = time.perf_counter()
+        try:
+            ok = await asyncio.wait_for(asyncio.to_thread(check), timeout=HEALTH_CHECK_TIMEOUT)
+            result = {'ok': bool(ok)}
+        except asyncio.TimeoutError:
+            result = {'ok': False, 'error': f'timeout após {HEALTH_CHECK_TIMEOUT}s'}
+        except Exception as e:
+            result = {'ok': False, 'error': str(e)}
+        result['latency_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        return result
@@ -0,0 +1,220 @@
+"""Atualização de partidas ao vivo sem reprocessar a temporada inteira.
+
+A descoberta (discover) busca os eventos agendados próximos do horário atual
+para os torneios configurados e os registra no Redis. A cada tick do
+scheduler, poll consulta apenas os eventos cujo próximo polling já venceu,
+com intervalo adaptado ao status da partida, e grava no MongoDB as partidas
+encerradas.
+"""
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+from etl.game_record import GameRecord
+from etl.transform import Transform
+from redis_client import get_redis
+
+TRACKED_KEY = 'live:events'
+# Eventos já encerrados/descartados (score = quando saíram do acompanhamento)
+DONE_KEY = 'live:done'
+
+# Janela (em horas) em torno do horário atual considerada na descoberta
+LIVE_LOOKAHEAD_HOURS = float(os.getenv('LIVE_LOOKAHEAD_HOURS', 6))
+LIVE_LOOKBEHIND_HOURS = float(os.getenv('LIVE_LOOKBEHIND_HOURS', 4))
+
+# Intervalos adaptativos de polling (segundos)
+LIVE_POLL_INPROGRESS = int(os.getenv('LIVE_POLL_INPROGRESS', 120))
+LIVE_POLL_PREMATCH = int(os.getenv('LIVE_POLL_PREMATCH', 300))
+LIVE_POLL_FAR = int(os.getenv('LIVE_POLL_FAR', 1800))
+# Tentativas (a cada LIVE_POLL_INPROGRESS segundos) de obter as estatísticas de um jogo encerrado
+LIVE_STATS_RETRIES = int(os.getenv('LIVE_STATS_RETRIES', 10))
+
+# Status que não voltarão a ter estatísticas; o evento deixa de ser acompanhado
+_DROPPED_STATUSES = {'canceled', 'postponed', 'suspended', 'interrupted'}
+
+
+def parse_live_tournaments(raw: str) -> Dict[int, str]:
+    """Converte "325:football,132:basketball" em {325: 'football', 132: 'basketball'}."""
+    tournaments = {}
+    for item in (raw or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        tournament_id, _, category = item.partition(':')
+        tournaments[int(tournament_id)] = category or 'football'
+    return tournaments
+
+
+LIVE_TOURNAMENTS = parse_live_tournaments(os.getenv('LIVE_TOURNAMENTS', ''))
+
+
+class LiveRefresh:
+
+    def __init__(self, extractor, loader, tournaments: Dict[int, str] = None):
+        self.extractor = extractor
+        self.loader = loader
+        self.tournaments = LIVE_TOURNAMENTS if tournaments is None else tournaments
+        self.redis = get_redis()
+
+    def discover(self, now: float = None) -> int:
+        """Registra os eventos dos torneios configurados dentro da janela de acompanhamento."""
+        now = now or time.time()
+        start = now - LIVE_LOOKBEHIND_HOURS * 3600
+        end = now + LIVE_LOOKAHEAD_HOURS * 3600
+        dates = {
+            datetime.fromtimestamp(ts, tz=timezone.utc).strftime('%Y-%m-%d')
+            for ts in (start, now, end)
+        }
+
+        # Esquece eventos concluídos que já saíram da janela
+        self.redis.zremrangebyscore(DONE_KEY, 0, start - LIVE_LOOKAHEAD_HOURS * 3600)
+        done = set(self.redis.zrange(DONE_KEY, 0, -1))
+
+        tracked = 0
+        for category in set(self.tournaments.values()):
+            for date in sorted(dates):
+                for event in self.extractor.get_scheduled_events(category, date):
+                    tournament_id = event.get('tournament', {}).get('uniqueTournament', {}).get('id')
+                    if self.tournaments.get(tournament_id) != category:
+                        continue
+                    start_ts = event.get('startTimestamp', 0)
+                    if not start <= start_ts <= end or str(event['id']) in done:
+                        continue
+                    entry = {
+                        'id': event['id'],
+                        'tournament_id': tournament_id,
+                        'collection': category,
+                        'start': start_ts,
+                        'next_poll': self.__next_poll(event.get('status', {}).get('type'), start_ts, now),
+                    }
+                    # Não sobrescreve o agendamento de eventos já acompanhados
+                    if self.redis.hsetnx(TRACKED_KEY, event['id'], json.dumps(entry)):
+                        tracked += 1
+        return tracked
+
+    def poll(self, now: float = None) -> Dict[str, int]:
+        """Consulta os eventos com polling vencido e grava os que terminaram."""
+        now = now or time.time()
+        summary = {'polled': 0, 'saved': 0, 'dropped': 0, 'tracked': 0}
+        # Jogos encerrados por coleção; o evento só deixa de ser acompanhado depois de gravado
+        finished: Dict[str, List[Tuple[str, dict]]] = {}
+
+        for event_id, raw in self.redis.hgetall(TRACKED_KEY).items():
+            entry = json.loads(raw)
+            if entry['next_poll'] > now:
+                continue
+
+            summary['polled'] += 1
+            try:
+                event = self.extractor.get_event(entry['id'])
+            except Exception as e:
+                print(f"Erro ao consultar evento {entry['id']}: {str(e)}")
+                self.__retry_later(event_id, entry, now)
+                continue
+
+            status = event.get('status', {}).get('type')
+            if status == 'finished':
+                try:
+                    game = self.__build_game(event)
+                except Exception as e:
+                    print(f"Erro ao obter estatísticas do evento {entry['id']}: {str(e)}")
+                    summary['dropped'] += self.__retry_finished(event_id, entry, now)
+                    continue
+                if game is None:
+                    self.__untrack(event_id, now)
+                    continue
+                games = Transform([game], entry['tournament_id']).transform()
+                if games:
+                    finished.setdefault(entry['collection'], []).append((event_id, games[0]))
+                else:
+                    # Estatísticas ainda não publicadas
+                    summary['dropped'] += self.__retry_finished(event_id, entry, now)
+            elif status in _DROPPED_STATUSES or entry['start'] < now - LIVE_LOOKBEHIND_HOURS * 3600:
+                self.__untrack(event_id, now)
+                summary['dropped'] += 1
+            else:
+                entry['next_poll'] = self.__next_poll(status, entry['start'], now)
+                self.redis.hset(TRACKED_KEY, event_id, json.dumps(entry))
+
+        for collection, items in finished.items():
+            games = [game for _, game in items]
+            try:
+                self.__keep_saved_round(games, collection)
+                self.loader.upsert_data(games, collection)
+            except Exception as e:
+                # Os eventos continuam acompanhados e são gravados no próximo tick
+                print(f"Erro ao gravar partidas encerradas em {collection}: {str(e)}")
+                continue
+            for event_id, _ in items:
+                self.__untrack(event_id, now)
+            summary['saved'] += len(games)
+
+        summary['tracked'] = self.redis.hlen(TRACKED_KEY)
+        return summary
+
+    def __keep_saved_round(self, games, collection):
+        """Mantém o `round` (página da extração) de jogos já salvos, que o upsert substituiria."""
+        saved = self.loader.database.get_collection(collection).find(
+            {'id': {'$in': [game['id'] for game in games]}}, {'id': 1, 'round': 1}
+        )
+        rounds = {doc['id']: doc.get('round') for doc in saved}
+        for game in games:
+            game['round'] = rounds.get(game['id'])
+
+    def __retry_later(self, event_id, entry, now):
+        entry['next_poll'] = now + LIVE_POLL_INPROGRESS
+        self.redis.hset(TRACKED_KEY, event_id, json.dumps(entry))
+
+    def __retry_finished(self, event_id, entry, now) -> int:
+        """Reagenda um jogo encerrado sem estatísticas; após LIVE_STATS_RETRIES tentativas deixa de acompanhá-lo.
+
+        Retorna 1 quando o evento foi descartado.
+        """
+        retries = entry.get('stats_retries', 0)
+        if retries >= LIVE_STATS_RETRIES:
+            print(f"Evento {entry['id']} encerrado sem estatísticas após {retries} tentativas")
+            self.__untrack(event_id, now)
+            return 1
+        entry['stats_retries'] = retries + 1
+        self.__retry_later(event_id, entry, now)
+        return 0
+
+    def __untrack(self, event_id, now):
+        self.redis.hdel(TRACKED_KEY, event_id)
+        self.redis.zadd(DONE_KEY, {event_id: now})
+
+    def __build_game(self, event):
+        """Monta o GameRecord do jogo encerrado.
+
+        O evento não diz em que página de get_games_by_season o jogo aparece,
+        então `round` fica vazio aqui (preservado do MongoDB ao salvar); a
+        rodada do campeonato vai em `round_number`, como na extração.
+        Erros de rede ou de resposta de get_game_stats são propagados.
+        """
+        if 'current' not in event.get('homeScore', {}) and 'current' not in event.get('awayScore', {}):
+            return None
+        try:
+            stats = self.extractor.get_game_stats(event['id'])
+        except (KeyError, IndexError):
+            stats = None
+        return GameRecord.from_event(
+            event,
+            event.get('season', {}).get('id'),
+            None,
+            stats
+        )
+
+    @staticmethod
+    def __next_poll(status, start_ts, now):
+        """Intervalo adaptativo: frequente durante o jogo, espaçado longe do início."""
+        if status == 'inprogress':
+            return now + LIVE_POLL_INPROGRESS
+        seconds_to_start = start_ts - now
+        if seconds_to_start > LIVE_POLL_FAR:
+            # Só volta a consultar pouco antes do início previsto
+            return start_ts - LIVE_POLL_PREMATCH
+        if seconds_to_start > 0:
+            return now + min(LIVE_POLL_PREMATCH, seconds_to_start)
+        return now + LIVE_POLL_INPROGRESS
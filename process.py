@@ -1,4 +1,8 @@
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Iterable, Tuple
+
+from streaming_stats import QuantileSketch, RunningStats
+
+DEFAULT_PERCENTILES = (0.25, 0.5, 0.75, 0.9)
 
 
 def _to_float(value: Any) -> float:
@@ -36,9 +40,36 @@ def _compute_outcome(home_score: float, away_score: float, team_as_home: bool) -
     return "losses"
 
 
-def _aggregate(games: list, team_as_home: bool) -> Dict:
-    """Calcula média por estatística e resultados para a lista de jogos fornecida."""
-    accum: Dict[str, Dict[str, Dict[str, float]]] = {}
+def _new_distribution() -> Dict:
+    return {"moments": RunningStats(), "sketch": QuantileSketch()}
+
+
+def _summarize_distribution(dist: Dict, percentiles: Iterable[float]) -> Dict:
+    moments: RunningStats = dist["moments"]
+    quantiles = dist["sketch"].quantiles(percentiles)
+    # O sketch tem erro relativo; mantém os percentis dentro do intervalo observado
+    for key, value in quantiles.items():
+        if value is not None:
+            quantiles[key] = min(max(value, moments.min), moments.max)
+    return {
+        "mean": moments.mean,
+        "variance": moments.variance,
+        "stddev": moments.stddev,
+        "min": moments.min,
+        "max": moments.max,
+        "percentiles": quantiles,
+    }
+
+
+def _aggregate(games: list, team_as_home: bool, distribution: bool = False,
+               percentiles: Iterable[float] = DEFAULT_PERCENTILES) -> Dict:
+    """Calcula média por estatística e resultados para a lista de jogos fornecida.
+
+    Com distribution=True inclui, para a equipe e o adversário, variância,
+    desvio padrão, mínimo, máximo e percentis aproximados, calculados em uma
+    única passada com memória constante por estatística.
+    """
+    accum: Dict[str, Dict[str, Dict[str, Any]]] = {}
     games_count = 0
     record = {"wins": 0, "draws": 0, "losses": 0}
 
@@ -68,6 +99,13 @@ def _aggregate(games: list, team_as_home: bool) -> Dict:
                     stat_bucket["team_sum"] += team_val
                     stat_bucket["opp_sum"] += opp_val
                     stat_bucket["count"] += 1
+                    if distribution:
+                        team_dist = stat_bucket.setdefault("team_dist", _new_distribution())
+                        opp_dist = stat_bucket.setdefault("opp_dist", _new_distribution())
+                        team_dist["moments"].add(team_val)
+                        team_dist["sketch"].add(team_val)
+                        opp_dist["moments"].add(opp_val)
+                        opp_dist["sketch"].add(opp_val)
 
     averages = {}
     for category, stats_map in accum.items():
@@ -78,16 +116,20 @@ def _aggregate(games: list, team_as_home: bool) -> Dict:
                 "team_avg": data["team_sum"] / count,
                 "opponent_avg": data["opp_sum"] / count,
             }
+            if distribution:
+                cat_avg[name]["team"] = _summarize_distribution(data["team_dist"], percentiles)
+                cat_avg[name]["opponent"] = _summarize_distribution(data["opp_dist"], percentiles)
         averages[category] = cat_avg
 
     return {"games_count": games_count, "record": record, "stats_avg": averages}
 
 
-def get_versus_stats(home_games: list, away_games: list):
+def get_versus_stats(home_games: list, away_games: list, distribution: bool = False,
+                     percentiles: Iterable[float] = DEFAULT_PERCENTILES):
     seasons = {game.get('season') for game in home_games + away_games if game.get('season') is not None}
 
     return {
         "seasons": sorted(seasons),
-        "home_games": _aggregate(home_games, team_as_home=True),
-        "away_games": _aggregate(away_games, team_as_home=False),
+        "home_games": _aggregate(home_games, team_as_home=True, distribution=distribution, percentiles=percentiles),
+        "away_games": _aggregate(away_games, team_as_home=False, distribution=distribution, percentiles=percentiles),
     }
\ No newline at end of file
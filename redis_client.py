@@ -0,0 +1,18 @@
+import os
+
+import redis
+from dotenv import load_dotenv
+
+load_dotenv()
+
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+_client = None
+
+
+def get_redis():
+    """Retorna um cliente Redis compartilhado pelo processo (criado sob demanda)."""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+    return _client
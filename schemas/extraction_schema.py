@@ -1,15 +1,18 @@
 from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class SeasonExtractionRequest(BaseModel):
     tournament_id: int
     season_id: int
+    # Prioridade da task na fila: 0 é a mais alta, 9 a mais baixa
+    priority: Optional[int] = Field(default=None, ge=0, le=9)
 
 
 class AllSeasonsExtractionRequest(BaseModel):
     slug_tournament: str
     tournament_id: int
     country: str
-    length_tournaments: Optional[List[int]] = None
\ No newline at end of file
+    length_tournaments: Optional[List[int]] = None
+    priority: Optional[int] = Field(default=None, ge=0, le=9)
\ No newline at end of file
@@ -0,0 +1,17 @@
+from typing import Annotated, List
+
+from pydantic import BaseModel, Field
+
+# Limite de confrontos por requisição (mantém o $or/IN da consulta única em tamanho controlado)
+MAX_VERSUS_PAIRS = 500
+
+
+class TeamPair(BaseModel):
+    team_one: str
+    team_two: str
+
+
+class VersusBatchRequest(BaseModel):
+    pairs: List[TeamPair] = Field(min_length=1, max_length=MAX_VERSUS_PAIRS)
+    distribution: bool = False
+    percentiles: List[Annotated[float, Field(ge=0, le=1)]] = Field(default=[0.25, 0.5, 0.75, 0.9], min_length=1)
@@ -0,0 +1,48 @@
+"""Serialização JSON rápida (orjson) para as respostas da API e as mensagens do Celery.
+
+ObjectId do MongoDB é convertido para string durante a própria serialização,
+sem percorrer nem copiar os documentos antes.
+"""
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from kombu.serialization import register
+
+CELERY_SERIALIZER = 'orjson'
+CELERY_CONTENT_TYPE = 'application/x-orjson'
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Tipo não serializável em JSON: {type(value).__name__}")
+
+
+def dumps(data) -> bytes:
+    return orjson.dumps(data, default=_default)
+
+
+def loads(data):
+    return orjson.loads(data)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse codificada com orjson e suporte a ObjectId.
+
+    Para payloads grandes, retorne a resposta diretamente do endpoint: assim o
+    FastAPI não passa o conteúdo pelo jsonable_encoder.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def register_celery_serializer():
+    """Registra o serializer 'orjson' no kombu (mensagens das tasks e resultados)."""
+    register(
+        CELERY_SERIALIZER,
+        lambda data: dumps(data).decode('utf-8'),
+        loads,
+        content_type=CELERY_CONTENT_TYPE,
+        content_encoding='utf-8',
+    )
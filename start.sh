@@ -34,12 +34,27 @@ echo ""
 # Criar diretório para logs se não existir
 mkdir -p logs
 
-# Iniciar Celery Worker em background
-echo "✓ Iniciando Celery Worker..."
-celery -A celery_worker.celery_app worker --loglevel=info --logfile=logs/celery_worker.log &
+# Iniciar Celery Workers em background (uma fila por perfil de task)
+echo "✓ Iniciando Celery Worker (fila interactive)..."
+celery -A celery_worker.celery_app worker -Q interactive -n interactive@%h \
+    --concurrency=${INTERACTIVE_CONCURRENCY:-4} --prefetch-multiplier=${INTERACTIVE_PREFETCH:-4} \
+    --loglevel=info --logfile=logs/celery_worker.log &
 CELERY_PID=$!
 echo "  PID: $CELERY_PID"
 
+echo "✓ Iniciando Celery Worker (fila backfill)..."
+celery -A celery_worker.celery_app worker -Q backfill -n backfill@%h -O fair \
+    --concurrency=${BACKFILL_CONCURRENCY:-2} --prefetch-multiplier=${BACKFILL_PREFETCH:-1} \
+    --loglevel=info --logfile=logs/celery_backfill.log &
+BACKFILL_PID=$!
+echo "  PID: $BACKFILL_PID"
+
+# Iniciar Celery Beat (atualização de partidas ao vivo)
+echo "✓ Iniciando Celery Beat..."
+celery -A celery_worker.celery_app beat --loglevel=info --logfile=logs/celery_beat.log &
+BEAT_PID=$!
+echo "  PID: $BEAT_PID"
+
 # Aguardar um pouco para garantir que o worker iniciou
 sleep 2
 
@@ -60,6 +75,8 @@ echo "Docs: http://localhost:8000/docs"
 echo ""
 echo "Logs:"
 echo "  - Celery: logs/celery_worker.log"
+echo "  - Celery (backfill): logs/celery_backfill.log"
+echo "  - Celery Beat: logs/celery_beat.log"
 echo "  - API: console"
 echo ""
 echo "Para parar os serviços, pressione Ctrl+C"
@@ -70,6 +87,8 @@ cleanup() {
     echo ""
     echo "Parando serviços..."
     kill $CELERY_PID 2>/dev/null
+    kill $BACKFILL_PID 2>/dev/null
+    kill $BEAT_PID 2>/dev/null
     kill $API_PID 2>/dev/null
     echo "Serviços parados."
     exit 0
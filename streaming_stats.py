@@ -0,0 +1,169 @@
+"""Acumuladores de estatísticas em uma única passada, com memória constante.
+
+- RunningStats: contagem, média, variância (Welford), mínimo e máximo.
+- QuantileSketch: percentis aproximados com erro relativo limitado (no estilo
+  do DDSketch), com número máximo de buckets.
+
+Ambos podem ser combinados (merge) e serializados (to_dict/from_dict), de modo
+que resultados de temporadas ou shards diferentes são unidos sem guardar os
+valores originais.
+"""
+import math
+from typing import Dict, Iterable, Optional
+
+
+class RunningStats:
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: 'RunningStats') -> 'RunningStats':
+        """Combina outro acumulador neste (fórmula de Chan et al.)."""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self) -> float:
+        """Variância amostral (n - 1); 0 com menos de dois valores."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.variance)
+
+    def to_dict(self) -> Dict:
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2,
+                'min': self.min if self.count else None, 'max': self.max if self.count else None}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'RunningStats':
+        stats = cls()
+        stats.count = data['count']
+        stats.mean = data['mean']
+        stats.m2 = data['m2']
+        stats.min = data['min'] if data['min'] is not None else math.inf
+        stats.max = data['max'] if data['max'] is not None else -math.inf
+        return stats
+
+
+class QuantileSketch:
+    """Sketch de quantis com erro relativo `relative_accuracy` sobre o valor retornado.
+
+    Cada valor cai em um bucket logarítmico; o número de buckets por sinal é
+    limitado a `max_bins` (os menores em módulo são fundidos se o limite for
+    atingido), então a memória não cresce com o número de jogos.
+    """
+
+    _MIN_INDEXABLE = 1e-9
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 1024):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float):
+        self.count += 1
+        if value > self._MIN_INDEXABLE:
+            self.__add_to(self.positive, self.__index(value))
+        elif value < -self._MIN_INDEXABLE:
+            self.__add_to(self.negative, self.__index(-value))
+        else:
+            self.zero_count += 1
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Sketches com precisões diferentes não podem ser combinados")
+        for index, count in other.positive.items():
+            self.__add_to(self.positive, index, count)
+        for index, count in other.negative.items():
+            self.__add_to(self.negative, index, count)
+        self.zero_count += other.zero_count
+        self.count += other.count
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        # Ordem crescente: negativos de maior módulo, zeros, positivos de menor módulo
+        for index in sorted(self.negative, reverse=True):
+            seen += self.negative[index]
+            if seen > rank:
+                return -self.__value(index)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.positive):
+            seen += self.positive[index]
+            if seen > rank:
+                return self.__value(index)
+        return self.__value(max(self.positive)) if self.positive else 0.0
+
+    def quantiles(self, qs: Iterable[float]) -> Dict[str, Optional[float]]:
+        return {f"p{round(q * 100, 2):g}": self.quantile(q) for q in qs}
+
+    def to_dict(self) -> Dict:
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'max_bins': self.max_bins,
+            'positive': {str(index): count for index, count in self.positive.items()},
+            'negative': {str(index): count for index, count in self.negative.items()},
+            'zero_count': self.zero_count,
+            'count': self.count,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'QuantileSketch':
+        sketch = cls(data['relative_accuracy'], data['max_bins'])
+        sketch.positive = {int(index): count for index, count in data['positive'].items()}
+        sketch.negative = {int(index): count for index, count in data['negative'].items()}
+        sketch.zero_count = data['zero_count']
+        sketch.count = data['count']
+        return sketch
+
+    def __index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def __value(self, index: int) -> float:
+        return 2 * self._gamma ** index / (self._gamma + 1)
+
+    def __add_to(self, bins: Dict[int, int], index: int, count: int = 1):
+        bins[index] = bins.get(index, 0) + count
+        if len(bins) > self.max_bins:
+            # Funde os dois buckets de menor módulo (perde precisão só nos valores mais próximos de zero)
+            lowest, second = sorted(bins)[:2]
+            bins[second] += bins.pop(lowest)
@@ -0,0 +1,135 @@
+"""Eventos de estado das tasks via Redis pub/sub.
+
+Os workers publicam cada mudança de estado no canal da task. Na API, o
+TaskEventHub mantém uma única assinatura por task, compartilhada por todos os
+clientes que acompanham aquela task, e distribui os eventos em memória.
+"""
+import asyncio
+import json
+import time
+from typing import Callable, Dict, Optional, Set
+
+import redis.asyncio as aioredis
+
+from redis_client import REDIS_URL, get_redis
+
+FINAL_STATES = {'SUCCESS', 'FAILURE', 'REVOKED'}
+
+
+def channel(task_id: str) -> str:
+    return f"task-events:{task_id}"
+
+
+def publish(task_id: str, event: dict):
+    """Publica um evento de estado da task (chamado pelos workers)."""
+    get_redis().publish(channel(task_id), json.dumps(event, default=str))
+
+
+class TaskEventHub:
+
+    def __init__(self, snapshot: Callable[[str], dict], redis_url: str = REDIS_URL):
+        # snapshot(task_id) lê o estado atual no backend do Celery (síncrono)
+        self._snapshot = snapshot
+        self._redis_url = redis_url
+        self._redis = None
+        self._pubsub = None
+        self._reader = None
+        self._lock = asyncio.Lock()
+        self._watchers: Dict[str, Set[asyncio.Queue]] = {}
+        # Último evento conhecido de cada task acompanhada
+        self._last: Dict[str, dict] = {}
+        # Momento (time.monotonic) da última leitura do backend de cada task acompanhada
+        self._checked: Dict[str, float] = {}
+
+    async def start(self):
+        self._redis = aioredis.from_url(self._redis_url, decode_responses=True)
+        self._pubsub = self._redis.pubsub()
+        self._reader = asyncio.create_task(self.__read_loop())
+
+    async def stop(self):
+        if self._reader:
+            self._reader.cancel()
+        if self._pubsub:
+            await self._pubsub.aclose()
+        if self._redis:
+            await self._redis.aclose()
+
+    async def subscribe(self, task_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue()
+        async with self._lock:
+            if task_id not in self._watchers:
+                self._watchers[task_id] = set()
+                await self._pubsub.subscribe(channel(task_id))
+            self._watchers[task_id].add(queue)
+        return queue
+
+    async def unsubscribe(self, task_id: str, queue: asyncio.Queue):
+        async with self._lock:
+            watchers = self._watchers.get(task_id)
+            if watchers is None:
+                return
+            watchers.discard(queue)
+            if not watchers:
+                del self._watchers[task_id]
+                self._last.pop(task_id, None)
+                self._checked.pop(task_id, None)
+                await self._pubsub.unsubscribe(channel(task_id))
+
+    async def snapshot(self, task_id: str) -> dict:
+        """Estado atual da task; lido do backend só uma vez enquanto houver clientes acompanhando."""
+        event = self._last.get(task_id)
+        if event is None:
+            event = await asyncio.to_thread(self._snapshot, task_id)
+            if task_id in self._watchers:
+                self._last[task_id] = event
+                self._checked[task_id] = time.monotonic()
+        return event
+
+    async def recheck(self, task_id: str, interval: float):
+        """Relê o backend se a última leitura da task tem mais de interval segundos.
+
+        Detecta tasks que terminaram sem publicar o evento final; nesse caso o
+        estado final é entregue a todos os clientes da task. Vários clientes
+        chamando ao mesmo tempo geram uma única leitura por intervalo.
+        """
+        if task_id not in self._watchers:
+            return
+        now = time.monotonic()
+        checked = self._checked.get(task_id)
+        if checked is not None and now - checked < interval:
+            return
+        self._checked[task_id] = now
+        event = await asyncio.to_thread(self._snapshot, task_id)
+        if event.get('state') in FINAL_STATES:
+            self.__dispatch(task_id, event)
+
+    async def __read_loop(self):
+        while True:
+            try:
+                if not self._pubsub.subscribed:
+                    await asyncio.sleep(0.1)
+                    continue
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None:
+                    continue
+                task_id = message['channel'].split(':', 1)[1]
+                event = json.loads(message['data'])
+                if event.get('state') in FINAL_STATES:
+                    # Resultado completo lido uma única vez e repassado a todos os clientes
+                    final = await asyncio.to_thread(self._snapshot, task_id)
+                    if final.get('state') in FINAL_STATES:
+                        event = final
+                self.__dispatch(task_id, event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Erro ao ler eventos de tasks: {str(e)}")
+                await asyncio.sleep(1)
+
+    def __dispatch(self, task_id: str, event: dict):
+        watchers: Optional[Set[asyncio.Queue]] = self._watchers.get(task_id)
+        if not watchers:
+            return
+        self._last[task_id] = event
+        for queue in watchers:
+            queue.put_nowait(event)
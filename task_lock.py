@@ -0,0 +1,86 @@
+"""Locks de execução única (single-flight) para as tasks de extração.
+
+Cada extração é identificada por (tournament_id, season_id). Enquanto uma task
+com a mesma chave estiver na fila ou rodando, novas requisições recebem o id
+da task existente em vez de disparar outra extração.
+"""
+import os
+from typing import List, Optional, Union
+
+from celery.result import AsyncResult
+
+from redis_client import get_redis
+
+# Validade do lock enquanto a task aguarda na fila
+LOCK_TTL = int(os.getenv('TASK_LOCK_TTL', 3900))
+# Validade na fila de backfill, onde uma task pode esperar horas atrás de outras extrações longas
+BACKFILL_LOCK_TTL = int(os.getenv('TASK_LOCK_BACKFILL_TTL', 86400))
+# Validade renovada pela task em execução; se o worker morrer o lock expira sozinho
+LOCK_HEARTBEAT_TTL = int(os.getenv('TASK_LOCK_HEARTBEAT_TTL', 600))
+
+# Estados em que a task já terminou (ou morreu) e o lock pode ser descartado
+_FINISHED_STATES = {'SUCCESS', 'FAILURE', 'REVOKED'}
+
+# Remove o lock apenas se ele ainda pertencer à task informada
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Renova a validade apenas se o lock ainda pertencer à task informada
+_REFRESH_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+def season_lock_key(tournament_id: int, season_id: Union[int, str]) -> str:
+    return f"lock:extract:{tournament_id}:{season_id}"
+
+
+def seasons_lock_key(tournament_id: int, seasons: Optional[Union[int, List[int]]] = None) -> str:
+    """Chave para extrações de várias temporadas (todas, as N primeiras ou uma lista de ids)."""
+    if seasons is None:
+        scope = 'all'
+    elif isinstance(seasons, list):
+        scope = ','.join(str(season) for season in sorted(set(seasons)))
+    else:
+        scope = f"first-{seasons}"
+    return season_lock_key(tournament_id, scope)
+
+
+def acquire(key: str, task_id: str, celery_app, ttl: int = LOCK_TTL) -> Optional[str]:
+    """Tenta reservar a chave para task_id.
+
+    Retorna None quando o lock foi obtido, ou o id da task que já detém o lock.
+    Locks de tasks que já terminaram ou foram revogadas são liberados e a
+    reserva é refeita. Se o worker morrer, o lock expira após
+    LOCK_HEARTBEAT_TTL segundos sem renovação.
+    """
+    client = get_redis()
+    holder = None
+    for _ in range(3):
+        if client.set(key, task_id, nx=True, ex=ttl):
+            return None
+        holder = client.get(key)
+        if holder is None:
+            # Expirou entre o SET e o GET; tenta novamente
+            continue
+        if AsyncResult(holder, app=celery_app).state not in _FINISHED_STATES:
+            return holder
+        release(key, holder)
+    return holder
+
+
+def refresh(key: str, task_id: str, ttl: int = LOCK_HEARTBEAT_TTL) -> bool:
+    """Renova o lock da task em execução (heartbeat)."""
+    return bool(get_redis().eval(_REFRESH_SCRIPT, 1, key, task_id, ttl))
+
+
+def release(key: str, task_id: str) -> bool:
+    """Libera o lock somente se ele pertencer a task_id."""
+    return bool(get_redis().eval(_RELEASE_SCRIPT, 1, key, task_id))